@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, Hostel, Room, Bed, Student, FeeType, StudentFee, Expense, MessPlan
+from .models import User, Hostel, Room, Bed, Student, FeeType, StudentFee, Expense, MessPlan, FundMovement, Job
 
 class UserAdmin(BaseUserAdmin):
     list_display = ('username', 'email', 'role', 'hostel', 'is_staff')
@@ -51,4 +51,21 @@ class BedAdmin(admin.ModelAdmin):
 class FeeTypeAdmin(admin.ModelAdmin):
     list_display = ('name', 'periodicity')
 
+@admin.register(FundMovement)
+class FundMovementAdmin(admin.ModelAdmin):
+    list_display = ('hostel', 'kind', 'amount', 'created_at')
+    list_filter = ('hostel', 'kind')
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('task', 'status', 'attempts', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'task')
+    readonly_fields = ('started_at', 'finished_at')
+
 admin.site.register(User, UserAdmin)
\ No newline at end of file
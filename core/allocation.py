@@ -0,0 +1,176 @@
+"""Bed allocation.
+
+``Bed.student`` is the only record of who sleeps where. A bed is claimed
+with a conditional UPDATE (``... WHERE student_id IS NULL``) inside a
+transaction, so two wardens allocating at once can never put two
+students on one bed: the loser of the race simply moves on to the next
+free bed. On PostgreSQL free beds are also locked with
+``select_for_update(skip_locked=True)`` so concurrent requests pick
+different beds instead of contending for the same one.
+"""
+from collections import Counter
+
+from django.core import signing
+from django.db import transaction
+
+from .caching import invalidate_hostel
+from .models import Bed, Room, Student
+
+
+PLAN_MAX_AGE = 60 * 60
+
+
+class AllocationError(Exception):
+    pass
+
+
+def allocate_bed(student, room):
+    """Move ``student`` to a free bed in ``room`` and return that bed."""
+    with transaction.atomic():
+        old_room_id = Bed.objects.filter(student=student).values_list('room_id', flat=True).first()
+        if old_room_id is not None:
+            Bed.objects.filter(student=student).update(student=None)
+            Room.adjust_occupancy(old_room_id, -1)
+        free_beds = (
+            Bed.objects.select_for_update(skip_locked=True)
+            .filter(room=room, student__isnull=True)
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+        for bed_id in free_beds:
+            if Bed.objects.filter(pk=bed_id, student__isnull=True).update(student=student):
+                break
+        else:
+            raise AllocationError("No available beds in the selected room.")
+        Room.adjust_occupancy(room.id, 1)
+    invalidate_hostel(room.hostel_id)
+    return Bed.objects.select_related('room').get(pk=bed_id)
+
+
+def unassigned_requests(hostel, preferences=None, bed_type='', room_prefix=''):
+    """Build allocation requests for every student of ``hostel`` without a bed.
+
+    ``preferences`` is an iterable of dicts keyed by ``cnic`` with optional
+    ``bed_type``, ``room_prefix`` and ``group`` (students sharing a group
+    are kept in one room). Students without a row get the defaults.
+    """
+    by_cnic = {row['cnic'].strip(): row for row in preferences or () if row.get('cnic')}
+    requests = []
+    students = Student.objects.filter(hostel=hostel, assigned_bed__isnull=True).order_by('name', 'id')
+    for student in students:
+        row = by_cnic.get(student.cnic, {})
+        requests.append({
+            'student': student,
+            'bed_type': (row.get('bed_type') or bed_type).strip(),
+            'room_prefix': (row.get('room_prefix') or room_prefix).strip(),
+            'group': (row.get('group') or '').strip(),
+        })
+    return requests
+
+
+def plan_allocation(hostel, requests):
+    """Assign beds to ``requests`` in one pass over the hostel's free beds.
+
+    Groups are placed first, largest first, each into the matching room
+    with the fewest free beds that still fits the whole group, which keeps
+    larger rooms open for later groups. Returns ``{'assignments': [(student,
+    bed), ...], 'unplaced': [(student, reason), ...]}`` without saving.
+    """
+    free = {}
+    rooms = {}
+    beds = (
+        Bed.objects.filter(room__hostel=hostel, student__isnull=True)
+        .select_related('room')
+        .order_by('room__room_number', 'id')
+    )
+    for bed in beds:
+        rooms[bed.room_id] = bed.room
+        free.setdefault(bed.room_id, []).append(bed)
+
+    units = {}
+    for request in requests:
+        key = request['group'] or f"student:{request['student'].id}"
+        units.setdefault(key, []).append(request)
+
+    plan = {'assignments': [], 'unplaced': []}
+    for members in sorted(units.values(), key=len, reverse=True):
+        bed_type = next((m['bed_type'] for m in members if m['bed_type']), '')
+        prefix = next((m['room_prefix'] for m in members if m['room_prefix']), '')
+        candidates = [
+            room_id for room_id, room_beds in free.items()
+            if len(room_beds) >= len(members)
+            and (not bed_type or rooms[room_id].bed_type == bed_type)
+            and rooms[room_id].room_number.startswith(prefix)
+        ]
+        if not candidates:
+            reason = "No room with enough matching free beds"
+            if len(members) > 1:
+                reason += f" for group of {len(members)}"
+            plan['unplaced'].extend((m['student'], reason) for m in members)
+            continue
+        room_id = min(candidates, key=lambda r: (len(free[r]), rooms[r].room_number))
+        for member in members:
+            plan['assignments'].append((member['student'], free[room_id].pop(0)))
+        if not free[room_id]:
+            del free[room_id]
+    return plan
+
+
+def apply_allocation(plan):
+    """Save a plan from ``plan_allocation`` in a single transaction.
+
+    Raises AllocationError without changing anything if a planned bed was
+    taken, or a planned student got a bed, after the plan was made.
+    """
+    assignments = plan['assignments']
+    if not assignments:
+        return 0
+    bed_ids = [bed.id for _, bed in assignments]
+    student_ids = [student.id for student, _ in assignments]
+    with transaction.atomic():
+        still_free = list(
+            Bed.objects.select_for_update()
+            .filter(pk__in=bed_ids, student__isnull=True)
+            .values_list('id', flat=True)
+        )
+        if len(still_free) != len(bed_ids) or Bed.objects.filter(student__in=student_ids).exists():
+            raise AllocationError("Beds changed since the plan was made; preview it again.")
+        beds = []
+        for student, bed in assignments:
+            bed.student = student
+            beds.append(bed)
+        Bed.objects.bulk_update(beds, ['student'], batch_size=500)
+        for room_id, count in Counter(bed.room_id for bed in beds).items():
+            Room.adjust_occupancy(room_id, count)
+    invalidate_hostel(assignments[0][1].room.hostel_id)
+    return len(assignments)
+
+
+def _plan_salt(hostel):
+    return f'core.allocation.plan:{hostel.pk}'
+
+
+def sign_plan(hostel, plan):
+    """Return a signed token for the (bed, student) pairs in ``plan``, so
+    the plan a warden previewed can be applied exactly as shown."""
+    pairs = [[bed.id, student.id] for student, bed in plan['assignments']]
+    return signing.dumps(pairs, salt=_plan_salt(hostel), compress=True)
+
+
+def load_plan(hostel, token):
+    """Rebuild a plan from ``sign_plan``'s token for ``apply_allocation``.
+
+    Raises AllocationError if the token is invalid, expired or names beds
+    or students outside ``hostel``.
+    """
+    try:
+        pairs = signing.loads(token or '', salt=_plan_salt(hostel), max_age=PLAN_MAX_AGE)
+    except signing.BadSignature:
+        raise AllocationError("The previewed plan has expired or is invalid; preview it again.")
+    beds = Bed.objects.select_related('room').filter(room__hostel=hostel).in_bulk([bed_id for bed_id, _ in pairs])
+    students = Student.objects.filter(hostel=hostel).in_bulk([student_id for _, student_id in pairs])
+    try:
+        assignments = [(students[student_id], beds[bed_id]) for bed_id, student_id in pairs]
+    except KeyError:
+        raise AllocationError("Beds changed since the plan was made; preview it again.")
+    return {'assignments': assignments, 'unplaced': []}
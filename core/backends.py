@@ -0,0 +1,34 @@
+from django.contrib.auth.backends import ModelBackend
+from django.core.exceptions import PermissionDenied
+
+from .models import User
+
+
+class HostelUserBackend(ModelBackend):
+    """ModelBackend that loads the session user together with everything
+    the role checks and dashboards read from it.
+
+    ``AuthenticationMiddleware`` calls ``get_user`` once per request and
+    caches the result on ``request.user``, so ``user.hostel``,
+    ``user.student``, ``user.student.hostel`` and the student's bed and
+    room all come from that single joined query.
+
+    ``ModelBackend`` stays listed after this backend only so sessions
+    logged in through it remain valid; a rejected password stops the
+    chain here instead of being hashed a second time there.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        user = super().authenticate(request, username=username, password=password, **kwargs)
+        if user is None and password is not None:
+            raise PermissionDenied
+        return user
+
+    def get_user(self, user_id):
+        try:
+            user = User.objects.select_related(
+                'hostel', 'student__hostel', 'student__assigned_bed__room'
+            ).get(pk=user_id)
+        except User.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
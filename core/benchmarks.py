@@ -0,0 +1,134 @@
+"""Query-count, latency and memory benchmarks for the ``core`` views.
+
+``run_benchmarks`` requests every named URL in ``core.urls`` as each role
+against whatever data is in the current database, and returns one result
+per (role, URL). ``check_budgets`` compares those results with a budget
+file so CI can fail when a view starts issuing more queries (an N+1
+creeping back in) or gets slower or hungrier than allowed.
+"""
+import time
+import tracemalloc
+from collections import Counter
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import urls
+from .caching import invalidate_hostel
+from .models import Hostel, Job, MessPlan, Student
+
+ROLES = ('Student', 'Warden', 'Owner', 'Admin')
+SKIPPED_URLS = {'logout'}
+
+
+def url_targets(warden):
+    """Return ``(name, path)`` for every benchmarked URL in ``core.urls``.
+
+    Path parameters are filled with records from the warden's hostel so
+    warden pages render their real content rather than a 404.
+    """
+    hostel_id = warden.hostel_id if warden else None
+    student_id = Student.objects.filter(hostel=hostel_id).order_by('id').values_list('id', flat=True).first()
+    plan_id = MessPlan.objects.filter(hostel=hostel_id).order_by('id').values_list('id', flat=True).first()
+    job_id = Job.objects.filter(created_by=warden).order_by('id').values_list('id', flat=True).first()
+    samples = {'student_id': student_id or 0, 'plan_id': plan_id or 0, 'job_id': job_id or 0, 'kind': 'fees'}
+    targets = []
+    for pattern in urls.urlpatterns:
+        if pattern.name in SKIPPED_URLS:
+            continue
+        kwargs = {name: samples[name] for name in pattern.pattern.converters}
+        targets.append((pattern.name, reverse(pattern.name, kwargs=kwargs)))
+    return targets
+
+
+def _request(client, path):
+    response = client.get(path)
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def _cool():
+    # Orphan every cached dashboard value while leaving other cache users,
+    # such as cached_db sessions, alone.
+    for hostel_id in Hostel.objects.values_list('id', flat=True):
+        invalidate_hostel(hostel_id)
+
+
+def measure(client, path, warm=False):
+    """Time one GET of ``path``, then repeat it under tracemalloc for memory.
+
+    The two passes are kept apart because tracing allocations slows the
+    request down enough to distort the wall time.
+    """
+    if not warm:
+        _cool()
+    with CaptureQueriesContext(connection) as context:
+        start = time.perf_counter()
+        response = _request(client, path)
+        elapsed = time.perf_counter() - start
+    # captured_queries slices the live query log, which the next request
+    # empties, so copy it now.
+    queries = [query['sql'] for query in context.captured_queries]
+
+    if not warm:
+        _cool()
+    tracemalloc.start()
+    try:
+        _request(client, path)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    repeated = Counter(queries)
+    return {
+        'status': response.status_code,
+        'queries': len(queries),
+        'duplicate_queries': sum(count - 1 for count in repeated.values() if count > 1),
+        'ms': round(elapsed * 1000, 2),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def run_benchmarks(users, warm=False):
+    """Benchmark every URL as each role in ``users`` (role -> User).
+
+    With ``warm`` the dashboard cache is left alone between requests, so
+    the figures show cache hits; by default it is invalidated first and the
+    figures are the cold, worst case.
+    """
+    results = []
+    targets = url_targets(users.get('Warden'))
+    for role in ROLES:
+        user = users.get(role)
+        if user is None:
+            continue
+        client = Client()
+        client.force_login(user)
+        for name, path in targets:
+            results.append({'role': role, 'url': name, 'path': path, **measure(client, path, warm=warm)})
+    return results
+
+
+def check_budgets(results, budgets):
+    """Return a message for every result over its budget.
+
+    ``budgets`` maps ``"<role>:<url name>"`` or a bare ``"<url name>"`` (any
+    role) to limits on ``queries``, ``duplicate_queries``, ``ms`` and
+    ``peak_kb``. Only successful responses are checked; a role being
+    redirected away or refused a page costs nothing worth budgeting.
+    """
+    violations = []
+    for result in results:
+        if result['status'] >= 300:
+            continue
+        limits = budgets.get(f"{result['role']}:{result['url']}") or budgets.get(result['url']) or {}
+        for metric, limit in limits.items():
+            if result.get(metric, 0) > limit:
+                violations.append(
+                    f"{result['role']} {result['url']}: {metric} {result[metric]} > budget {limit}"
+                )
+    return violations
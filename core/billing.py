@@ -0,0 +1,57 @@
+"""Bulk fee posting.
+
+Fees created here go through ``bulk_create`` and so skip
+``StudentFee.save`` and its signals; the fund movement is posted and the
+dashboard cache invalidated once per call instead.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+
+from .caching import invalidate_hostel
+from .models import FeeType, Hostel, Student, StudentFee
+
+
+def generate_monthly_fees(hostel, period, amounts, batch_size=1000):
+    """Create the ``period`` fee of each monthly fee type for every student.
+
+    ``amounts`` maps a monthly fee type name (e.g. ``'mess'``) to its due
+    amount. Students that already have that fee for the period are
+    skipped, so running it twice for a month is harmless. Returns the
+    number of fees created; raises ``ValueError`` naming any key of
+    ``amounts`` that is not a monthly fee type, before creating anything.
+    """
+    fee_types = list(FeeType.objects.filter(periodicity='monthly', name__in=amounts))
+    unknown = sorted(set(amounts) - {fee_type.name for fee_type in fee_types})
+    if unknown:
+        raise ValueError(f"Unknown monthly fee type(s): {', '.join(unknown)}.")
+    if not fee_types:
+        return 0
+
+    with transaction.atomic():
+        # Serialises concurrent runs for the same hostel so the existence
+        # check below cannot race another generator.
+        list(Hostel.objects.select_for_update().filter(pk=hostel.pk).values_list('pk', flat=True))
+        existing = set(
+            StudentFee.objects.filter(
+                student__hostel=hostel, fee_type__in=fee_types, period=period
+            ).values_list('student_id', 'fee_type_id')
+        )
+        student_ids = Student.objects.filter(hostel=hostel).values_list('id', flat=True)
+        fees = [
+            StudentFee(
+                student_id=student_id,
+                fee_type=fee_type,
+                period=period,
+                due_amount=Decimal(amounts[fee_type.name]),
+                paid_amount=Decimal(0),
+            )
+            for student_id in student_ids.iterator()
+            for fee_type in fee_types
+            if (student_id, fee_type.id) not in existing
+        ]
+        StudentFee.objects.bulk_create(fees, batch_size=batch_size)
+        Hostel.post_funds(hostel.pk, sum((fee.paid_amount for fee in fees), Decimal(0)))
+    if fees:
+        invalidate_hostel(hostel.pk)
+    return len(fees)
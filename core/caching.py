@@ -0,0 +1,74 @@
+"""Per-hostel dashboard cache.
+
+Cached values are keyed by the current month and a version token per
+hostel. Saving or deleting anything that feeds a dashboard replaces the
+hostel's token when its transaction commits (see ``core.signals``), which orphans every value computed
+for it at once without having to know their keys. Hit and miss counts
+live in the cache too, so they add up across worker processes.
+"""
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+_MISSING = object()
+STAT_KEYS = {'hits': 'hms:stats:hits', 'misses': 'hms:stats:misses'}
+
+
+def _version_key(hostel_id):
+    return f'hms:hostel:{hostel_id}:version'
+
+
+def hostel_versions(hostel_ids):
+    """Return the current version token of each hostel, in order."""
+    keys = [_version_key(hostel_id) for hostel_id in hostel_ids]
+    found = cache.get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def invalidate_hostel(hostel_id):
+    """Replace the hostel's token once the current transaction commits.
+
+    Bumping it earlier would let a request still seeing the old rows cache
+    them under the new token, where they would stay until they expire.
+    """
+    transaction.on_commit(lambda: cache.set(_version_key(hostel_id), uuid.uuid4().hex, None))
+
+
+def _count(stat):
+    key = STAT_KEYS[stat]
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def cached(hostel_ids, name, compute):
+    """Return ``compute()`` for ``hostel_ids``, reusing it until one of
+    those hostels changes or the month rolls over."""
+    versions = hostel_versions(hostel_ids)
+    parts = [name, timezone.now().strftime('%Y-%m')]
+    parts += [f'{hostel_id}.{version}' for hostel_id, version in zip(hostel_ids, versions)]
+    key = 'hms:dashboard:' + hashlib.sha1(':'.join(parts).encode()).hexdigest()
+
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        _count('hits')
+        return value
+    _count('misses')
+    value = compute()
+    cache.set(key, value, settings.DASHBOARD_CACHE_TIMEOUT)
+    return value
+
+
+def stats():
+    values = cache.get_many(STAT_KEYS.values())
+    return {stat: values.get(key, 0) for stat, key in STAT_KEYS.items()}
@@ -0,0 +1,16 @@
+import importlib.util
+
+from django.core.checks import Warning, register
+
+
+@register()
+def mess_preview_renderer(app_configs, **kwargs):
+    """Mess plan previews (menu text, thumbnails and search) need PyMuPDF."""
+    if importlib.util.find_spec('pymupdf') is not None:
+        return []
+    return [Warning(
+        "PyMuPDF is not installed, so mess plan text and thumbnails are never built "
+        "and mess plan search finds nothing.",
+        hint="Install the PyMuPDF version pinned in requirements.txt.",
+        id='core.W001',
+    )]
@@ -0,0 +1,114 @@
+"""Serving stored files from views.
+
+``serve_file`` answers conditional GETs with a 304 before the file is
+opened, honours single ``Range`` requests with a 206, and with
+``MEDIA_ACCEL_REDIRECT_PREFIX`` set hands the transfer to nginx through
+``X-Accel-Redirect``, so no file bytes pass through Python at all.
+"""
+import hashlib
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_etags, quote_etag
+
+CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def file_etag(fieldfile):
+    """Strong ETag from the stored name, size and modification time."""
+    storage = fieldfile.storage
+    parts = [fieldfile.name, str(storage.size(fieldfile.name))]
+    try:
+        parts.append(storage.get_modified_time(fieldfile.name).isoformat())
+    except NotImplementedError:
+        pass
+    return quote_etag(hashlib.sha1('|'.join(parts).encode()).hexdigest()[:20])
+
+
+def _last_modified(fieldfile):
+    try:
+        return fieldfile.storage.get_modified_time(fieldfile.name).timestamp()
+    except NotImplementedError:
+        return None
+
+
+def parse_range(header, size):
+    """Return ``(start, end)`` for a single ``bytes=`` range, ``None`` to
+    ignore the header (missing, malformed or multi-range), or ``False``
+    when the range cannot be satisfied."""
+    match = RANGE_RE.match(header or '')
+    if not match or size == 0:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _read_range(f, start, length):
+    with f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_file(request, fieldfile, content_type, cache_control, filename=None):
+    etag = file_etag(fieldfile)
+    last_modified = _last_modified(fieldfile)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        # A 304 must repeat the validators the full response would carry.
+        not_modified['ETag'] = etag
+        if last_modified is not None:
+            not_modified['Last-Modified'] = http_date(last_modified)
+        not_modified['Cache-Control'] = cache_control
+        return not_modified
+
+    filename = filename or fieldfile.name.rsplit('/', 1)[-1]
+    prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', '')
+    if prefix:
+        # nginx serves the bytes (and any Range) from an internal location.
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + fieldfile.name
+    else:
+        size = fieldfile.storage.size(fieldfile.name)
+        if_range = request.headers.get('If-Range')
+        byte_range = None
+        if if_range is None or etag in parse_etags(if_range):
+            byte_range = parse_range(request.headers.get('Range'), size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        if byte_range:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                _read_range(fieldfile.storage.open(fieldfile.name, 'rb'), start, end - start + 1),
+                status=206, content_type=content_type,
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = str(end - start + 1)
+        else:
+            response = FileResponse(fieldfile.storage.open(fieldfile.name, 'rb'), content_type=content_type)
+        response['Accept-Ranges'] = 'bytes'
+
+    response['Content-Disposition'] = content_disposition_header(False, filename)
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = cache_control
+    return response
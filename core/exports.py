@@ -0,0 +1,62 @@
+"""Streaming CSV exports.
+
+Rows are read with ``values_list(...).iterator()`` and written straight
+into the response, so memory stays flat however many years of data a
+hostel has.
+"""
+import csv
+
+from .models import Expense, Student, StudentFee
+
+CHUNK_SIZE = 2000
+
+# kind -> (header, model, values_list fields, hostel lookup, date lookup)
+EXPORTS = {
+    'fees': (
+        ['Hostel', 'Student', 'CNIC', 'Fee Type', 'Period', 'Due', 'Paid', 'Created'],
+        StudentFee,
+        ['student__hostel__name', 'student__name', 'student__cnic', 'fee_type__name',
+         'period', 'due_amount', 'paid_amount', 'created_at'],
+        'student__hostel__in',
+        'created_at__date',
+    ),
+    'expenses': (
+        ['Hostel', 'Date', 'Category', 'Description', 'Amount'],
+        Expense,
+        ['hostel__name', 'date', 'category__name', 'description', 'amount'],
+        'hostel__in',
+        'date',
+    ),
+    'students': (
+        ['Hostel', 'Name', 'CNIC', 'Contact Number', 'Email', 'Emergency Contact',
+         'Enrollment Date', 'Room', 'Bed'],
+        Student,
+        ['hostel__name', 'name', 'cnic', 'contact_number', 'email',
+         'emergency_contact_number', 'enrollment_date', 'assigned_bed__room__room_number', 'assigned_bed__bed_number'],
+        'hostel__in',
+        'enrollment_date',
+    ),
+}
+
+
+class Echo:
+    """File-like object whose ``write`` hands the line back to csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(kind, hostels, start=None, end=None):
+    """Yield CSV lines for ``kind`` over ``hostels``, header first."""
+    header, model, fields, hostel_lookup, date_lookup = EXPORTS[kind]
+    queryset = model.objects.filter(**{hostel_lookup: hostels})
+    if start:
+        queryset = queryset.filter(**{f'{date_lookup}__gte': start})
+    if end:
+        queryset = queryset.filter(**{f'{date_lookup}__lte': end})
+    rows = queryset.order_by('pk').values_list(*fields).iterator(chunk_size=CHUNK_SIZE)
+
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
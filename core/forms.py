@@ -1,11 +1,16 @@
 from django import forms
 import re
-from django.db.models import Count
+from django.conf import settings
+from django.db.models import F
+from django.template.defaultfilters import filesizeformat
 from .models import (
     Student, Room, Hostel, StudentFee,
     MessPlan, Expense, ExpenseCategory, FeeType, User
 )
 
+CNIC_REGEX = r'^\d{5}-\d{7}-\d$'
+PHONE_REGEX = r'^\+\d{10,15}$'
+
 class StudentForm(forms.ModelForm):
     class Meta:
         model = Student
@@ -41,19 +46,54 @@ class RoomForm(forms.ModelForm):
                 raise forms.ValidationError(f"Number of beds must be {expected_beds} for {bed_type} room.")
         return number_of_beds
 
+class RoomRangeForm(forms.Form):
+    MAX_ROOMS = 500
+
+    prefix = forms.CharField(max_length=5, required=False, widget=forms.TextInput(attrs={'placeholder': 'e.g., A-'}))
+    start = forms.IntegerField(min_value=0, widget=forms.NumberInput(attrs={'placeholder': 'e.g., 101'}))
+    end = forms.IntegerField(min_value=0, widget=forms.NumberInput(attrs={'placeholder': 'e.g., 140'}))
+    bed_type = forms.ChoiceField(choices=Room.BED_TYPE_CHOICES)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get('start'), cleaned_data.get('end')
+        if start is None or end is None:
+            return cleaned_data
+        if end < start:
+            raise forms.ValidationError("End room number must not be below the start.")
+        if end - start + 1 > self.MAX_ROOMS:
+            raise forms.ValidationError(f"At most {self.MAX_ROOMS} rooms can be created at once.")
+        if len(f"{cleaned_data.get('prefix', '')}{end}") > Room._meta.get_field('room_number').max_length:
+            raise forms.ValidationError("Room numbers would be longer than 10 characters.")
+        return cleaned_data
+
 class RoomAllocationForm(forms.Form):
     room = forms.ModelChoiceField(queryset=Room.objects.none(), empty_label="Select a room")
 
     def __init__(self, *args, hostel=None, **kwargs):
         super().__init__(*args, **kwargs)
         if hostel:
-            available_rooms = Room.objects.filter(hostel=hostel).annotate(
-                available_beds=Count('beds') - Count('beds__student')
-            ).filter(available_beds__gt=0)
+            available_rooms = Room.objects.filter(
+                hostel=hostel, occupied_beds__lt=F('number_of_beds')
+            ).order_by('room_number')
             self.fields['room'].queryset = available_rooms
             if not available_rooms.exists():
                 self.fields['room'].empty_label = "No rooms available"
 
+class BatchAllocationForm(forms.Form):
+    bed_type = forms.ChoiceField(choices=(('', 'Any'),) + Room.BED_TYPE_CHOICES, required=False)
+    room_prefix = forms.CharField(max_length=10, required=False, widget=forms.TextInput(attrs={'placeholder': 'e.g., 1 for rooms 1xx'}))
+    preferences = forms.FileField(
+        required=False,
+        help_text="Optional CSV with columns: cnic, bed_type, room_prefix, group. Students sharing a group are kept in one room.",
+    )
+
+    def clean_preferences(self):
+        preferences = self.cleaned_data['preferences']
+        if preferences and not preferences.name.lower().endswith('.csv'):
+            raise forms.ValidationError("Preferences must be a CSV file.")
+        return preferences
+
 class StudentFeeForm(forms.ModelForm):
     fee_type = forms.ModelChoiceField(queryset=FeeType.objects.all())
     
@@ -82,6 +122,39 @@ class StudentFeeForm(forms.ModelForm):
             raise forms.ValidationError("Period must be in YYYY-MM format.")
         return period
 
+class MonthlyFeeGenerationForm(forms.Form):
+    period = forms.CharField(max_length=7, widget=forms.TextInput(attrs={'placeholder': 'YYYY-MM'}))
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fee_types = list(FeeType.objects.filter(periodicity='monthly').order_by('name'))
+        for fee_type in self.fee_types:
+            self.fields[f'amount_{fee_type.name}'] = forms.DecimalField(
+                label=f"{fee_type.name.title()} fee amount",
+                required=False, min_value=0, max_digits=10, decimal_places=2,
+                widget=forms.NumberInput(attrs={'min': 0, 'step': '0.01'}),
+            )
+
+    def clean_period(self):
+        period = self.cleaned_data['period']
+        if not re.match(r'^\d{4}-\d{2}$', period):
+            raise forms.ValidationError("Period must be in YYYY-MM format.")
+        return period
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not self.amounts():
+            raise forms.ValidationError("Enter an amount for at least one monthly fee.")
+        return cleaned_data
+
+    def amounts(self):
+        amounts = {}
+        for fee_type in self.fee_types:
+            amount = self.cleaned_data.get(f'amount_{fee_type.name}')
+            if amount is not None:
+                amounts[fee_type.name] = amount
+        return amounts
+
 class MessPlanForm(forms.ModelForm):
     class Meta:
         model = MessPlan
@@ -99,7 +172,7 @@ class MessPlanForm(forms.ModelForm):
 
     def clean_pdf_file(self):
         pdf_file = self.cleaned_data['pdf_file']
-        if pdf_file and not pdf_file.name.endswith('.pdf'):
+        if pdf_file and not pdf_file.name.lower().endswith('.pdf'):
             raise forms.ValidationError("File must be a PDF.")
         return pdf_file
 
@@ -133,7 +206,7 @@ class StudentUserForm(forms.Form):
 
     def clean_cnic(self):
         cnic = self.cleaned_data['cnic']
-        if not re.match(r'^\d{5}-\d{7}-\d$', cnic):
+        if not re.match(CNIC_REGEX, cnic):
             raise forms.ValidationError("CNIC must be in XXXXX-XXXXXXX-X format.")
         if Student.objects.filter(cnic=cnic).exists():
             raise forms.ValidationError("This CNIC is already registered.")
@@ -141,10 +214,55 @@ class StudentUserForm(forms.Form):
 
     def clean_emergency_contact_number(self):
         emergency_contact_number = self.cleaned_data['emergency_contact_number']
-        if emergency_contact_number and not re.match(r'^\+\d{10,15}$', emergency_contact_number):
+        if emergency_contact_number and not re.match(PHONE_REGEX, emergency_contact_number):
             raise forms.ValidationError("Emergency contact number must be in +XXXXXXXXXX format (10-15 digits).")
         return emergency_contact_number
 
+class StudentImportRowForm(StudentUserForm):
+    """Validates one imported row. Username and CNIC uniqueness is checked
+    per chunk by ``core.imports`` instead of once per row."""
+
+    def clean_username(self):
+        return User.normalize_username(self.cleaned_data['username'])
+
+    def clean_cnic(self):
+        cnic = self.cleaned_data['cnic']
+        if not re.match(CNIC_REGEX, cnic):
+            raise forms.ValidationError("CNIC must be in XXXXX-XXXXXXX-X format.")
+        return cnic
+
+class StudentImportForm(forms.Form):
+    file = forms.FileField(help_text="CSV or XLSX with columns: " + ", ".join([
+        'username', 'password', 'name', 'contact_number', 'email',
+        'enrollment_date', 'cnic', 'emergency_contact_number',
+    ]))
+
+    def clean_file(self):
+        uploaded = self.cleaned_data['file']
+        if not uploaded.name.lower().endswith(('.csv', '.xlsx')):
+            raise forms.ValidationError("File must be a CSV or XLSX spreadsheet.")
+        # The file is stored on the import job, so keep it to a sane size.
+        if uploaded.size > settings.STUDENT_IMPORT_MAX_SIZE:
+            raise forms.ValidationError(f"File is larger than {filesizeformat(settings.STUDENT_IMPORT_MAX_SIZE)}.")
+        return uploaded
+
+class ExportFilterForm(forms.Form):
+    hostel = forms.ModelChoiceField(queryset=Hostel.objects.none(), required=False, empty_label="All hostels")
+    start = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    end = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+
+    def __init__(self, *args, hostels=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if hostels is not None:
+            self.fields['hostel'].queryset = hostels
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get('start'), cleaned_data.get('end')
+        if start and end and start > end:
+            raise forms.ValidationError("Start date must be on or before the end date.")
+        return cleaned_data
+
 class StudentCNICForm(forms.ModelForm):
     class Meta:
         model = Student
@@ -155,7 +273,7 @@ class StudentCNICForm(forms.ModelForm):
 
     def clean_cnic(self):
         cnic = self.cleaned_data['cnic']
-        if cnic and not re.match(r'^\d{5}-\d{7}-\d$', cnic):
+        if cnic and not re.match(CNIC_REGEX, cnic):
             raise forms.ValidationError("CNIC must be in XXXXX-XXXXXXX-X format.")
         if cnic and Student.objects.exclude(id=self.instance.id).filter(cnic=cnic).exists():
             raise forms.ValidationError("This CNIC is already registered.")
@@ -171,10 +289,18 @@ class StudentEmergencyContactForm(forms.ModelForm):
 
     def clean_emergency_contact_number(self):
         emergency_contact_number = self.cleaned_data['emergency_contact_number']
-        if emergency_contact_number and not re.match(r'^\+\d{10,15}$', emergency_contact_number):
+        if emergency_contact_number and not re.match(PHONE_REGEX, emergency_contact_number):
             raise forms.ValidationError("Emergency contact number must be in +XXXXXXXXXX format (10-15 digits).")
         return emergency_contact_number
 
+def limit_hostel_choices(field, queryset, hostels):
+    """Accept only ``queryset`` in a hostel ``field`` and list ``hostels``,
+    the same rows already loaded, so rendering it runs no query."""
+    field.queryset = queryset
+    field.choices = [('', field.empty_label)] + [
+        (field.prepare_value(hostel), field.label_from_instance(hostel)) for hostel in hostels
+    ]
+
 class WardenUserForm(forms.Form):
     username = forms.CharField(max_length=150, required=True)
     password = forms.CharField(widget=forms.PasswordInput, required=True)
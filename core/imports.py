@@ -0,0 +1,121 @@
+"""Bulk student import from CSV or XLSX uploads.
+
+Rows are streamed from the upload, validated with ``StudentImportRowForm``
+and inserted a chunk at a time: one query each for username and CNIC
+clashes, passwords hashed in a thread pool, then ``bulk_create`` for the
+students and their user accounts.
+"""
+import csv
+import io
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+
+from .caching import invalidate_hostel
+from .forms import StudentImportRowForm
+from .models import Student, User
+
+COLUMNS = [
+    'username', 'password', 'name', 'contact_number', 'email',
+    'enrollment_date', 'cnic', 'emergency_contact_number',
+]
+
+
+def read_rows(uploaded):
+    """Yield one dict per data row of an uploaded CSV or XLSX file."""
+    if uploaded.name.lower().endswith('.xlsx'):
+        yield from _read_xlsx(uploaded)
+        return
+    yield from csv.DictReader(io.TextIOWrapper(uploaded, encoding='utf-8-sig', newline=''))
+
+
+def _read_xlsx(uploaded):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("XLSX import needs the openpyxl package; upload a CSV instead.")
+    sheet = load_workbook(uploaded, read_only=True, data_only=True).active
+    rows = sheet.iter_rows(values_only=True)
+    header = [str(cell or '').strip() for cell in next(rows, [])]
+    for values in rows:
+        yield {key: ('' if value is None else value) for key, value in zip(header, values)}
+
+
+def import_students(hostel, rows, chunk_size=500, workers=4):
+    """Create a user and student for each valid row in ``rows``.
+
+    Returns ``{'created': int, 'errors': [(row_number, message), ...]}``
+    where row numbers count data rows from 1.
+    """
+    result = {'created': 0, 'errors': []}
+    numbered = enumerate(rows, start=1)
+    seen_usernames, seen_cnics = set(), set()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            chunk = list(islice(numbered, chunk_size))
+            if not chunk:
+                break
+            _import_chunk(hostel, chunk, pool, seen_usernames, seen_cnics, result)
+    if result['created']:
+        # bulk_create sends no post_save signals.
+        invalidate_hostel(hostel.pk)
+    return result
+
+
+def _import_chunk(hostel, chunk, pool, seen_usernames, seen_cnics, result):
+    valid = []
+    for number, row in chunk:
+        form = StudentImportRowForm({key: row.get(key, '') for key in COLUMNS})
+        if not form.is_valid():
+            message = '; '.join(
+                f"{field}: {' '.join(errors)}" for field, errors in form.errors.items()
+            )
+            result['errors'].append((number, message))
+            continue
+        valid.append((number, form.cleaned_data))
+
+    usernames = {data['username'] for _, data in valid}
+    cnics = {data['cnic'] for _, data in valid}
+    taken_usernames = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+    taken_cnics = set(Student.objects.filter(cnic__in=cnics).values_list('cnic', flat=True))
+
+    accepted = []
+    for number, data in valid:
+        if data['username'] in taken_usernames or data['username'] in seen_usernames:
+            result['errors'].append((number, "username: This username is already taken."))
+        elif data['cnic'] in taken_cnics or data['cnic'] in seen_cnics:
+            result['errors'].append((number, "cnic: This CNIC is already registered."))
+        else:
+            seen_usernames.add(data['username'])
+            seen_cnics.add(data['cnic'])
+            accepted.append((number, data))
+    if not accepted:
+        return
+
+    hashes = pool.map(make_password, [data['password'] for _, data in accepted])
+    students = [
+        Student(
+            hostel=hostel,
+            name=data['name'],
+            contact_number=data['contact_number'],
+            email=data['email'],
+            enrollment_date=data['enrollment_date'],
+            cnic=data['cnic'],
+            emergency_contact_number=data['emergency_contact_number'],
+        )
+        for _, data in accepted
+    ]
+    try:
+        with transaction.atomic():
+            Student.objects.bulk_create(students)
+            User.objects.bulk_create([
+                User(username=data['username'], password=password, role='Student', student=student)
+                for (_, data), password, student in zip(accepted, hashes, students)
+            ])
+    except IntegrityError as e:
+        first, last = accepted[0][0], accepted[-1][0]
+        result['errors'].append((first, f"Rows {first}-{last} were not imported: {e}"))
+        return
+    result['created'] += len(accepted)
@@ -0,0 +1,149 @@
+"""A small database-backed job queue.
+
+Views call ``enqueue`` to record a ``Job`` in the same transaction as the
+rest of their work and return at once; ``manage.py run_jobs`` claims
+queued jobs and runs the registered task function. A task that raises
+is retried with exponential backoff until ``max_attempts`` is reached,
+and a job left ``running`` by a worker that died is queued again once its
+heartbeat, touched every ``HEARTBEAT_INTERVAL`` while it runs, is older
+than the stale timeout. Claiming is a conditional UPDATE, so
+any number of workers can share the queue on SQLite or PostgreSQL.
+
+With ``JOBS_RUN_INLINE`` set, jobs run in the enqueuing process as soon
+as its transaction commits, which suits tests and single-process setups.
+"""
+import logging
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+RETRY_DELAY = timedelta(seconds=30)
+HEARTBEAT_INTERVAL = timedelta(seconds=30)
+STALE_AFTER = timedelta(minutes=5)
+
+TASKS = {}
+
+
+def task(func):
+    """Register ``func`` so jobs can name it; it must take keyword
+    arguments that survive a JSON round trip and return JSON too."""
+    TASKS[func.__name__] = func
+    return func
+
+
+def enqueue(task_name, user=None, max_attempts=3, payload=None, **kwargs):
+    """Queue ``task_name(**kwargs)``. ``payload`` bytes are stored on the
+    job and passed to the task as its ``payload`` argument."""
+    if task_name not in TASKS:
+        raise ValueError(f"Unknown task '{task_name}'.")
+    job = Job.objects.create(
+        task=task_name, kwargs=kwargs, payload=payload, created_by=user, max_attempts=max_attempts,
+    )
+    if getattr(settings, 'JOBS_RUN_INLINE', False):
+        transaction.on_commit(lambda: run_job(job.pk))
+    return job
+
+
+def claim(job_id=None):
+    """Mark the next due job (or ``job_id``) as running and return it, or
+    return ``None`` when there is nothing to do."""
+    now = timezone.now()
+    due = Job.objects.filter(status='queued', run_after__lte=now)
+    if job_id is not None:
+        due = due.filter(pk=job_id)
+    for pk in due.order_by('run_after', 'pk').values_list('pk', flat=True)[:10]:
+        # Another worker may have taken it since the SELECT; only the
+        # UPDATE that still sees it queued wins.
+        claimed = Job.objects.filter(pk=pk, status='queued').update(
+            status='running', started_at=now, heartbeat_at=now, attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+class _Heartbeat:
+    """Touch ``heartbeat_at`` of a claimed job from a background thread
+    until the ``with`` block exits."""
+
+    def __init__(self, jobs, interval=HEARTBEAT_INTERVAL):
+        self.jobs = jobs
+        self.interval = interval.total_seconds()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._beat, daemon=True)
+
+    def _beat(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                try:
+                    self.jobs.update(heartbeat_at=timezone.now())
+                except DatabaseError:
+                    logger.warning("Could not record a heartbeat for %s.", self.jobs, exc_info=True)
+        finally:
+            # The thread has its own connection; don't leave it open.
+            connection.close()
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+
+def run(job):
+    """Run a claimed job and record how it went."""
+    func = TASKS.get(job.task)
+    now = timezone.now
+    # Only this claim of the job may record its outcome: if it was given
+    # up as stale meanwhile, the row belongs to whoever took it over.
+    jobs = Job.objects.filter(pk=job.pk, status='running', attempts=job.attempts)
+    try:
+        if func is None:
+            raise LookupError(f"Unknown task '{job.task}'.")
+        kwargs = dict(job.kwargs)
+        if job.payload is not None:
+            kwargs['payload'] = bytes(job.payload)
+        with _Heartbeat(jobs):
+            result = func(**kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning("Job %s (%s) failed on attempt %s.", job.pk, job.task, job.attempts)
+        if func is not None and job.attempts < job.max_attempts:
+            delay = RETRY_DELAY * 2 ** (job.attempts - 1)
+            jobs.update(status='queued', run_after=now() + delay, error=error)
+        else:
+            jobs.update(status='failed', finished_at=now(), error=error, payload=None)
+    else:
+        if not jobs.update(status='succeeded', result=result, finished_at=now(), error='', payload=None):
+            logger.warning("Job %s (%s) finished after it was given up as stale.", job.pk, job.task)
+
+
+def run_job(job_id):
+    """Run ``job_id`` now if it is still queued."""
+    job = claim(job_id)
+    if job is not None:
+        run(job)
+
+
+def requeue_stale(stale_after=STALE_AFTER):
+    """Give jobs whose worker vanished mid-run another attempt, or fail
+    them once they have used up their attempts."""
+    cutoff = timezone.now() - stale_after
+    stale = Job.objects.filter(status='running').filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff),
+    )
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', finished_at=timezone.now(), error="The worker stopped before the job finished.",
+    )
+    return failed + stale.update(status='queued', run_after=timezone.now())
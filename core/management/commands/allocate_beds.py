@@ -0,0 +1,44 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.allocation import AllocationError, apply_allocation, plan_allocation, unassigned_requests
+from core.models import Hostel
+
+
+class Command(BaseCommand):
+    help = "Assign free beds to every student of a hostel who has none, in one transaction."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hostel', type=int, required=True, help="Id of the hostel to allocate.")
+        parser.add_argument('--preferences', help="CSV with columns cnic, bed_type, room_prefix, group.")
+        parser.add_argument('--bed-type', default='', help="Default bed type, e.g. 2-bed.")
+        parser.add_argument('--room-prefix', default='', help="Default room number prefix, e.g. 1.")
+        parser.add_argument('--dry-run', action='store_true', help="Print the plan without saving it.")
+
+    def handle(self, *args, **options):
+        try:
+            hostel = Hostel.objects.get(pk=options['hostel'])
+        except Hostel.DoesNotExist:
+            raise CommandError(f"Hostel {options['hostel']} does not exist.")
+
+        rows = None
+        if options['preferences']:
+            with open(options['preferences'], newline='', encoding='utf-8-sig') as f:
+                rows = list(csv.DictReader(f))
+
+        requests = unassigned_requests(hostel, rows, options['bed_type'], options['room_prefix'])
+        plan = plan_allocation(hostel, requests)
+        for student, bed in plan['assignments']:
+            self.stdout.write(f"{student.name} ({student.cnic}) -> room {bed.room.room_number}, bed {bed.bed_number}")
+        for student, reason in plan['unplaced']:
+            self.stdout.write(self.style.WARNING(f"{student.name} ({student.cnic}) not placed: {reason}"))
+
+        if options['dry_run']:
+            self.stdout.write(f"Dry run: {len(plan['assignments'])} student(s) would be allocated.")
+            return
+        try:
+            allocated = apply_allocation(plan)
+        except AllocationError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Allocated beds to {allocated} student(s)."))
@@ -0,0 +1,93 @@
+import json
+import re
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+from core.benchmarks import check_budgets, run_benchmarks
+from core.seeding import seed_hostels
+
+# The benchmark clears and cools its cache, so it must never be the shared
+# one: that would log everyone out of cache-backed sessions, and the seeded
+# hostels' ids would bump the version tokens of real hostels.
+BENCHMARK_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def parse_scale(value):
+    match = re.match(r'^(\d+)x(\d+)$', value)
+    if not match:
+        raise CommandError(f"Invalid scale '{value}'. Use HOSTELSxSTUDENTS, e.g. 10x1000.")
+    return int(match.group(1)), int(match.group(2))
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database at one or more scales and measure query count, "
+        "wall time and peak memory of every core view per role."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', action='append', default=[], metavar='HOSTELSxSTUDENTS',
+            help="Data volume to benchmark, e.g. --scale 1x100 --scale 10x1000. Repeatable (default: 1x100).",
+        )
+        parser.add_argument('--periods', type=int, default=3, help="Months of fee history per student.")
+        parser.add_argument('--warm', action='store_true', help="Keep the dashboard cache between requests.")
+        parser.add_argument(
+            '--session-backend', choices=('db', 'cached_db', 'signed_cookies'),
+            help="Session backend to benchmark with (default: the SESSION_BACKEND setting).",
+        )
+        parser.add_argument('--output', help="Write the JSON report to this file instead of stdout.")
+        parser.add_argument('--budgets', help="JSON budget file; exit with an error if any view exceeds it.")
+
+    def handle(self, *args, **options):
+        scales = [parse_scale(value) for value in options['scale'] or ['1x100']]
+        budgets = {}
+        if options['budgets']:
+            with open(options['budgets']) as f:
+                budgets = json.load(f)
+
+        media_root = tempfile.mkdtemp(prefix='hms-benchmark-')
+        isolated = {'CACHES': BENCHMARK_CACHES, 'MEDIA_ROOT': media_root}
+        if options['session_backend']:
+            isolated['SESSION_ENGINE'] = f"django.contrib.sessions.backends.{options['session_backend']}"
+
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        runner.setup_test_environment()
+        old_config = runner.setup_databases()
+        report = []
+        try:
+            with override_settings(**isolated):
+                for hostels, students in scales:
+                    call_command('flush', interactive=False, verbosity=0)
+                    cache.clear()
+                    users = seed_hostels(hostels, students, periods=options['periods'])
+                    report.append({
+                        'hostels': hostels,
+                        'students': students,
+                        'results': run_benchmarks(users, warm=options['warm']),
+                    })
+        finally:
+            runner.teardown_databases(old_config)
+            runner.teardown_test_environment()
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+        violations = []
+        for run in report:
+            violations += [f"[{run['hostels']}x{run['students']}] {v}" for v in check_budgets(run['results'], budgets)]
+        if violations:
+            raise CommandError("Views over budget:\n" + "\n".join(violations))
+        if budgets:
+            self.stderr.write(self.style.SUCCESS("All views within budget."))
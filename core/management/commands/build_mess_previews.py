@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from core.mess_previews import build_preview
+from core.models import MessPlan
+
+
+class Command(BaseCommand):
+    help = "Extract text and render thumbnails for mess plans that do not have them yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Rebuild every plan, not only those missing a preview.")
+
+    def handle(self, *args, **options):
+        plans = MessPlan.objects.exclude(pdf_file='')
+        if not options['all']:
+            plans = plans.filter(thumbnail='')
+        built = skipped = 0
+        for plan_id in plans.values_list('pk', flat=True).iterator():
+            try:
+                ok = build_preview(plan_id)
+            except Exception as e:
+                self.stderr.write(f"Mess plan {plan_id}: {e}")
+                ok = False
+            if ok:
+                built += 1
+            else:
+                skipped += 1
+        self.stdout.write(self.style.SUCCESS(f"Built {built} preview(s); {skipped} plan(s) skipped."))
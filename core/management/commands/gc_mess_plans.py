@@ -0,0 +1,89 @@
+import os
+import time
+
+from django.core.files import File
+from django.core.management.base import BaseCommand
+
+from core.mess_previews import PREVIEW_DIRECTORY
+from core.models import MessPlan
+from core.storage import TEMP_PREFIX
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete stored mess plan files that no MessPlan refers to. With --rehash, first move "
+        "plans still stored under their upload name into the shared content-addressed blobs. "
+        "Cached previews of files no plan uses are removed too."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report what would change without changing it.")
+        parser.add_argument(
+            '--min-age', type=int, default=3600,
+            help="Leave files modified within this many seconds alone, so uploads in flight "
+                 "are never collected (default: 3600).",
+        )
+        parser.add_argument('--rehash', action='store_true', help="Deduplicate plans stored before blobs were used.")
+
+    def handle(self, *args, **options):
+        field = MessPlan._meta.get_field('pdf_file')
+        storage = field.storage
+        directory = field.upload_to.rstrip('/')
+        dry_run = options['dry_run']
+
+        if options['rehash']:
+            moved = 0
+            for plan in MessPlan.objects.exclude(pdf_file=''):
+                if storage.is_blob(plan.pdf_file.name) or not storage.exists(plan.pdf_file.name):
+                    continue
+                moved += 1
+                if not dry_run:
+                    with storage.open(plan.pdf_file.name, 'rb') as f:
+                        name = storage.save(f'{directory}/{os.path.basename(plan.pdf_file.name)}', File(f))
+                    MessPlan.objects.filter(pk=plan.pk).update(pdf_file=name)
+            self.stdout.write(f"{moved} plan(s) {'would be ' if dry_run else ''}moved to shared blobs.")
+
+        referenced = set(MessPlan.objects.values_list('pdf_file', flat=True))
+        cutoff = time.time() - options['min_age']
+        removed = freed = 0
+        if storage.exists(directory):
+            for filename in storage.listdir(directory)[1]:
+                name = f'{directory}/{filename}'
+                if name in referenced:
+                    continue
+                if not (storage.is_blob(name) or filename.startswith(TEMP_PREFIX)) and not options['rehash']:
+                    # Files from before blobs are only collected alongside --rehash.
+                    continue
+                path = storage.path(name)
+                if os.path.getmtime(path) > cutoff:
+                    continue
+                removed += 1
+                freed += os.path.getsize(path)
+                if not dry_run:
+                    storage.delete(name)
+
+        # Previews are cached per file hash; drop those no plan shows any more.
+        preview_storage = MessPlan._meta.get_field('thumbnail').storage
+        shown = {
+            os.path.splitext(os.path.basename(name))[0]
+            for name in MessPlan.objects.exclude(thumbnail='').values_list('thumbnail', flat=True)
+        }
+        shown.update(
+            os.path.splitext(os.path.basename(name))[0]
+            for name in referenced if name and storage.is_blob(name)
+        )
+        if preview_storage.exists(PREVIEW_DIRECTORY):
+            for filename in preview_storage.listdir(PREVIEW_DIRECTORY)[1]:
+                if os.path.splitext(filename)[0] in shown:
+                    continue
+                name = f'{PREVIEW_DIRECTORY}/{filename}'
+                path = preview_storage.path(name)
+                if os.path.getmtime(path) > cutoff:
+                    continue
+                removed += 1
+                freed += os.path.getsize(path)
+                if not dry_run:
+                    preview_storage.delete(name)
+
+        verb = "would be removed" if dry_run else "removed"
+        self.stdout.write(self.style.SUCCESS(f"{removed} orphaned file(s) {verb}, {freed} byte(s)."))
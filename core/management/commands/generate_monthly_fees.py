@@ -0,0 +1,49 @@
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.billing import generate_monthly_fees
+from core.models import Hostel
+
+
+class Command(BaseCommand):
+    help = "Generate the monthly fees of a period for every student in one or all hostels."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--period', default=None, help="Billing period as YYYY-MM (default: current month).")
+        parser.add_argument('--hostel', type=int, help="Only generate fees for the hostel with this id.")
+        parser.add_argument(
+            '--amount', action='append', default=[], metavar='FEE_TYPE=AMOUNT',
+            help="Due amount for a monthly fee type, e.g. --amount mess=3000. Repeatable.",
+        )
+
+    def handle(self, *args, **options):
+        period = options['period'] or timezone.now().strftime('%Y-%m')
+        if not re.match(r'^\d{4}-\d{2}$', period):
+            raise CommandError("Period must be in YYYY-MM format.")
+
+        amounts = {}
+        for item in options['amount']:
+            name, _, value = item.partition('=')
+            try:
+                amounts[name.strip()] = Decimal(value)
+            except InvalidOperation:
+                raise CommandError(f"Invalid amount '{item}'. Use FEE_TYPE=AMOUNT.")
+        if not amounts:
+            raise CommandError("Give at least one --amount FEE_TYPE=AMOUNT.")
+
+        hostels = Hostel.objects.all()
+        if options['hostel']:
+            hostels = hostels.filter(pk=options['hostel'])
+
+        total = 0
+        for hostel in hostels:
+            try:
+                created = generate_monthly_fees(hostel, period, amounts)
+            except ValueError as e:
+                raise CommandError(str(e))
+            total += created
+            self.stdout.write(f"{hostel.name}: {created} fee(s) created")
+        self.stdout.write(self.style.SUCCESS(f"Generated {total} fee(s) for {period}."))
@@ -0,0 +1,41 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+
+from core.models import FundMovement, Hostel
+
+
+class Command(BaseCommand):
+    help = "Recompute Hostel.total_funds from the fund movement ledger. Safe to run from cron."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hostel', type=int, help="Only reconcile the hostel with this id.")
+        parser.add_argument('--dry-run', action='store_true', help="Report drift without fixing it.")
+
+    def handle(self, *args, **options):
+        hostels = Hostel.objects.all()
+        if options['hostel']:
+            hostels = hostels.filter(pk=options['hostel'])
+
+        with transaction.atomic():
+            hostels = list(hostels.select_for_update().only('id', 'name', 'total_funds'))
+            balances = dict(
+                FundMovement.objects.filter(hostel__in=hostels)
+                .values('hostel')
+                .annotate(total=Sum('amount'))
+                .values_list('hostel', 'total')
+            )
+            drifted = 0
+            for hostel in hostels:
+                expected = balances.get(hostel.id) or Decimal('0')
+                if hostel.total_funds == expected:
+                    continue
+                drifted += 1
+                self.stdout.write(f"{hostel.name}: {hostel.total_funds} -> {expected}")
+                if not options['dry_run']:
+                    Hostel.objects.filter(pk=hostel.pk).update(total_funds=expected)
+
+        verb = "would be corrected" if options['dry_run'] else "corrected"
+        self.stdout.write(self.style.SUCCESS(f"{len(hostels)} hostel(s) checked, {drifted} {verb}."))
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from core.models import Bed, Hostel, Room
+
+
+def bed_count(outer_field, **filters):
+    beds = (
+        Bed.objects.filter(**{outer_field: OuterRef('pk')}, **filters)
+        .order_by().values(outer_field).annotate(n=Count('pk')).values('n')
+    )
+    return Coalesce(Subquery(beds), 0)
+
+
+class Command(BaseCommand):
+    help = "Recompute the occupied/total bed counters on Room and Hostel from Bed rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report drift without fixing it.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rooms = (
+                Room.objects.annotate(actual=bed_count('room', student__isnull=False))
+                .exclude(occupied_beds=F('actual'))
+                .values_list('pk', 'actual')
+            )
+            hostels = (
+                Hostel.objects.annotate(
+                    actual_total=bed_count('room__hostel'),
+                    actual_occupied=bed_count('room__hostel', student__isnull=False),
+                )
+                .filter(~Q(total_beds=F('actual_total')) | ~Q(occupied_beds=F('actual_occupied')))
+                .values_list('pk', 'actual_total', 'actual_occupied')
+            )
+            rooms, hostels = list(rooms), list(hostels)
+            if not options['dry_run']:
+                for pk, actual in rooms:
+                    Room.objects.filter(pk=pk).update(occupied_beds=actual)
+                for pk, total, occupied in hostels:
+                    Hostel.objects.filter(pk=pk).update(total_beds=total, occupied_beds=occupied)
+
+        verb = "would be corrected" if options['dry_run'] else "corrected"
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(rooms)} room(s) and {len(hostels)} hostel(s) {verb}."
+        ))
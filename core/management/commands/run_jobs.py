@@ -0,0 +1,62 @@
+import time
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.jobs import claim, requeue_stale, run
+
+# How often, in seconds, to look for jobs whose worker died, busy or not.
+STALE_CHECK_INTERVAL = 60
+# How often, in seconds, to delete expired sessions, as `clearsessions` does.
+SESSION_CLEANUP_INTERVAL = 60 * 60
+
+
+def clear_expired_sessions():
+    try:
+        import_module(settings.SESSION_ENGINE).SessionStore.clear_expired()
+    except NotImplementedError:
+        pass  # signed_cookies: nothing is stored server-side.
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs until stopped, or until the queue is empty with --burst."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--burst', action='store_true', help="Exit once no job is due.")
+        parser.add_argument('--sleep', type=float, default=1.0, help="Seconds to wait when the queue is empty (default: 1).")
+        parser.add_argument('--max-jobs', type=int, help="Exit after running this many jobs.")
+        parser.add_argument(
+            '--stale-after', type=int, default=300,
+            help="Retry running jobs whose heartbeat is this many seconds old (default: 300).",
+        )
+
+    def handle(self, *args, **options):
+        stale_after = timedelta(seconds=options['stale_after'])
+        ran = 0
+        next_stale_check = next_session_cleanup = time.monotonic()
+        try:
+            while options['max_jobs'] is None or ran < options['max_jobs']:
+                close_old_connections()
+                if time.monotonic() >= next_stale_check:
+                    requeue_stale(stale_after)
+                    next_stale_check = time.monotonic() + STALE_CHECK_INTERVAL
+                if time.monotonic() >= next_session_cleanup:
+                    clear_expired_sessions()
+                    next_session_cleanup = time.monotonic() + SESSION_CLEANUP_INTERVAL
+                job = claim()
+                if job is None:
+                    if options['burst']:
+                        break
+                    time.sleep(options['sleep'])
+                    continue
+                started = time.monotonic()
+                run(job)
+                ran += 1
+                job.refresh_from_db(fields=['status'])
+                self.stdout.write(f"{job} in {time.monotonic() - started:.1f}s")
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Ran {ran} job(s)."))
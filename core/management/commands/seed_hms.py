@@ -0,0 +1,58 @@
+import secrets
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Bed, Expense, StudentFee, User
+from core.seeding import PASSWORD, USERNAME_PREFIX, seed_hostels
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-generate synthetic hostels, rooms, beds, students, fee history and expenses. "
+        "The same --seed always produces the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hostels', type=int, default=1, help="Number of hostels (default: 1).")
+        parser.add_argument('--students', type=int, default=100, help="Students across all hostels (default: 100).")
+        parser.add_argument('--periods', type=int, default=12, help="Months of seat/mess fee history (default: 12).")
+        parser.add_argument('--month', default='2025-05', help="Latest fee period as YYYY-MM (default: 2025-05).")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed (default: 0).")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows per INSERT (default: 1000).")
+        parser.add_argument(
+            '--force', action='store_true',
+            help="Seed even with DEBUG off. The seeded users then get a random password, printed at the end.",
+        )
+
+    def handle(self, *args, **options):
+        if options['hostels'] < 1 or options['students'] < 0 or options['periods'] < 1:
+            raise CommandError("Need at least one hostel and one period, and a non-negative student count.")
+        if not settings.DEBUG and not options['force']:
+            raise CommandError(
+                "DEBUG is off, so this may be a real database. Seed it anyway with --force."
+            )
+        if User.objects.filter(username__startswith=USERNAME_PREFIX).exists():
+            raise CommandError("Seed data is already present. Run `manage.py flush` first.")
+        # The well-known password is only for local development databases.
+        password = PASSWORD if settings.DEBUG else secrets.token_urlsafe(12)
+
+        start = time.perf_counter()
+        seed_hostels(
+            hostels=options['hostels'],
+            students=options['students'],
+            periods=options['periods'],
+            month=options['month'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            password=password,
+        )
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {options['hostels']} hostel(s), {options['students']} student(s), "
+            f"{Bed.objects.count()} bed(s), {StudentFee.objects.count()} fee(s) and "
+            f"{Expense.objects.count()} expense(s) in {elapsed:.1f}s. "
+            f"Log in as {USERNAME_PREFIX}owner / {USERNAME_PREFIX}warden-1 / {USERNAME_PREFIX}admin "
+            f"with password {password}."
+        ))
@@ -0,0 +1,100 @@
+"""Text and thumbnail previews of mess plan PDFs.
+
+When a plan is saved with a new file, a ``build_mess_preview`` job is
+queued (see core.tasks). ``build_preview`` extracts the PDF's text into
+``MessPlan.menu_text`` and renders the first page to a PNG thumbnail, so
+dashboards can show the menu and search can match it without opening
+any PDF. Both are cached under ``mess_previews/`` by the file's SHA-256,
+so a file uploaded again, for any plan, is never rendered twice.
+
+Rendering needs PyMuPDF (pinned in requirements.txt); without it plans
+are left without a preview, the PDF download keeps working as before and
+``manage.py check`` warns (core.W001).
+"""
+import hashlib
+import logging
+import os
+
+from django.core.files.storage import default_storage
+
+from .models import MessPlan
+from .storage import BlobWriter
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_DIRECTORY = 'mess_previews'
+THUMBNAIL_WIDTH = 480
+
+
+def file_digest(fieldfile):
+    """SHA-256 of a stored file, read from the blob name when it has one."""
+    storage = fieldfile.storage
+    if hasattr(storage, 'is_blob') and storage.is_blob(fieldfile.name):
+        return os.path.splitext(os.path.basename(fieldfile.name))[0]
+    digest = hashlib.sha256()
+    with storage.open(fieldfile.name, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def render_pdf(data):
+    """Return ``(text, png_bytes)`` for a PDF, or ``None`` without PyMuPDF."""
+    try:
+        import pymupdf
+    except ImportError:
+        logger.warning("Mess plan previews need the PyMuPDF package; skipping.")
+        return None
+    with pymupdf.open(stream=data, filetype='pdf') as document:
+        text = '\n'.join(page.get_text().strip() for page in document).strip()
+        png = b''
+        if document.page_count:
+            page = document[0]
+            zoom = THUMBNAIL_WIDTH / page.rect.width
+            png = page.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom)).tobytes('png')
+    return text, png
+
+
+def _write(digest, extension, data):
+    # Written to a temporary file and renamed into place, so workers
+    # building the same preview at once never see or leave a partial or
+    # renamed copy; whichever finishes second keeps the first one's file.
+    writer = BlobWriter(default_storage, PREVIEW_DIRECTORY, extension)
+    try:
+        writer.write(data)
+        return writer.commit(stem=digest)
+    except BaseException:
+        writer.discard()
+        raise
+
+
+def build_preview(plan_id):
+    """Fill in ``menu_text`` and ``thumbnail`` for one plan.
+
+    Returns ``True`` when the plan has a preview afterwards.
+    """
+    plan = MessPlan.objects.filter(pk=plan_id).first()
+    if plan is None or not plan.pdf_file:
+        return False
+    digest = file_digest(plan.pdf_file)
+    text_name = f'{PREVIEW_DIRECTORY}/{digest}.txt'
+    thumbnail_name = f'{PREVIEW_DIRECTORY}/{digest}.png'
+
+    if default_storage.exists(text_name):
+        with default_storage.open(text_name, 'rb') as f:
+            text = f.read().decode()
+    else:
+        with plan.pdf_file.open('rb') as f:
+            rendered = render_pdf(f.read())
+        if rendered is None:
+            return False
+        text, png = rendered
+        if png:
+            _write(digest, '.png', png)
+        # The text goes last: its presence marks the cache entry complete.
+        _write(digest, '.txt', text.encode())
+
+    thumbnail = thumbnail_name if default_storage.exists(thumbnail_name) else ''
+    # Only touch the row if it still points at the file that was rendered.
+    MessPlan.objects.filter(pk=plan_id, pdf_file=plan.pdf_file.name).update(menu_text=text, thumbnail=thumbnail)
+    return True
@@ -0,0 +1,140 @@
+"""Opt-in per-request profiling.
+
+``RequestProfilingMiddleware`` is listed in ``MIDDLEWARE`` but removes
+itself at startup (``MiddlewareNotUsed``) unless ``REQUEST_PROFILING`` is
+on, so it costs nothing when disabled. When enabled it records, for
+every request, the number of SQL queries and their total time, how many
+of them repeat an earlier query's SQL shape (the N+1 signature), the
+template render time and the response size. These are sent back as a
+``Server-Timing`` header, which browser dev tools show next to the
+request, and logged as one JSON line on the ``hms.requests`` logger.
+
+A streamed body (CSV exports, file downloads) is produced after the
+headers have gone, so its ``Server-Timing`` covers the view only; the log
+line is written once the body has been sent and counts its queries and
+bytes too.
+"""
+import contextvars
+import json
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import Template
+
+logger = logging.getLogger('hms.requests')
+
+_profile = contextvars.ContextVar('hms_request_profile', default=None)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.shapes = Counter()
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # ``sql`` still has its placeholders, so queries differing only in
+        # parameters share a shape.
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_seconds += time.perf_counter() - start
+            self.shapes[sql] += 1
+
+    @property
+    def queries(self):
+        return sum(self.shapes.values())
+
+    @property
+    def duplicates(self):
+        return sum(count - 1 for count in self.shapes.values())
+
+    def top_duplicate(self):
+        sql, count = self.shapes.most_common(1)[0] if self.shapes else ('', 0)
+        return {'sql': sql[:200], 'count': count} if count > 1 else None
+
+
+def _timed_render(render):
+    def wrapper(self, *args, **kwargs):
+        profile = _profile.get()
+        if profile is None:
+            return render(self, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            profile.template_seconds += time.perf_counter() - start
+    wrapper.profiled = True
+    return wrapper
+
+
+@contextmanager
+def _watching(profile):
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(profile))
+        yield
+
+
+class RequestProfilingMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_PROFILING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if not getattr(Template.render, 'profiled', False):
+            Template.render = _timed_render(Template.render)
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        token = _profile.set(profile)
+        start = time.perf_counter()
+        try:
+            with _watching(profile):
+                response = self.get_response(request)
+        finally:
+            _profile.reset(token)
+        total = time.perf_counter() - start
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={profile.sql_seconds * 1000:.1f};desc="{profile.queries} queries, '
+            f'{profile.duplicates} duplicate"',
+            f'tpl;dur={profile.template_seconds * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+        if response.streaming and not response.is_async:
+            response.streaming_content = self._streamed(response.streaming_content, request, response, profile, start)
+        else:
+            self._log(request, response, profile, total, None if response.streaming else len(response.content))
+        return response
+
+    def _streamed(self, content, request, response, profile, start):
+        size = 0
+        try:
+            with _watching(profile):
+                for chunk in content:
+                    size += len(chunk)
+                    yield chunk
+        finally:
+            self._log(request, response, profile, time.perf_counter() - start, size)
+
+    def _log(self, request, response, profile, total, size):
+        match = request.resolver_match
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'ms': round(total * 1000, 1),
+            'queries': profile.queries,
+            'duplicate_queries': profile.duplicates,
+            'top_duplicate': profile.top_duplicate(),
+            'sql_ms': round(profile.sql_seconds * 1000, 1),
+            'template_ms': round(profile.template_seconds * 1000, 1),
+            'bytes': size,
+        }))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2 on 2026-10-18 02:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def seed_opening_balances(apps, schema_editor):
+    Hostel = apps.get_model('core', 'Hostel')
+    FundMovement = apps.get_model('core', 'FundMovement')
+    FundMovement.objects.bulk_create(
+        FundMovement(hostel=hostel, amount=hostel.total_funds, kind='opening')
+        for hostel in Hostel.objects.exclude(total_funds=0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FundMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('kind', models.CharField(choices=[('opening', 'Opening Balance'), ('fee', 'Fee Payment'), ('expense', 'Expense'), ('adjustment', 'Adjustment')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expense', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='fund_movements', to='core.expense')),
+                ('fee', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='fund_movements', to='core.studentfee')),
+                ('hostel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fund_movements', to='core.hostel')),
+            ],
+        ),
+        migrations.RunPython(seed_opening_balances, migrations.RunPython.noop),
+    ]
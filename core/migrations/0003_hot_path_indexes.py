@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-18 02:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_merge_duplicate_rows'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bed',
+            index=models.Index(fields=['room', 'student'], name='bed_room_student_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['hostel', 'date'], name='expense_hostel_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['hostel', 'name', 'id'], name='student_hostel_name_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='messplan',
+            constraint=models.UniqueConstraint(fields=('hostel', 'month'), name='unique_mess_plan_per_month'),
+        ),
+        migrations.AddConstraint(
+            model_name='studentfee',
+            constraint=models.UniqueConstraint(fields=('student', 'fee_type', 'period'), name='unique_fee_per_period'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2 on 2026-10-18 02:50
+
+from django.db import migrations
+from django.db.models import Count, Max, Sum
+
+
+def drop_duplicates(apps, schema_editor):
+    """Make the rows the new unique constraints cover unique.
+
+    Duplicate fees for a (student, fee_type, period) are separate
+    installments recorded before fees were unique, so each group is
+    merged into its newest row: amounts are summed and the group's fund
+    movements point at the merged fee, keeping the ledger in step with
+    ``Hostel.total_funds``. One-time fees (``period`` NULL) are not
+    covered by the constraint and are left alone. For mess plans only the
+    newest upload per (hostel, month) is kept.
+    """
+    MessPlan = apps.get_model('core', 'MessPlan')
+    StudentFee = apps.get_model('core', 'StudentFee')
+    FundMovement = apps.get_model('core', 'FundMovement')
+
+    plans = (
+        MessPlan.objects.values('hostel', 'month')
+        .annotate(rows=Count('id'), keep=Max('id'))
+        .filter(rows__gt=1)
+    )
+    for group in plans:
+        MessPlan.objects.filter(hostel=group['hostel'], month=group['month']).exclude(id=group['keep']).delete()
+
+    fees = (
+        StudentFee.objects.filter(period__isnull=False)
+        .values('student', 'fee_type', 'period')
+        .annotate(rows=Count('id'), keep=Max('id'), due=Sum('due_amount'), paid=Sum('paid_amount'))
+        .filter(rows__gt=1)
+    )
+    for group in fees:
+        duplicates = StudentFee.objects.filter(
+            student=group['student'], fee_type=group['fee_type'], period=group['period'],
+        ).exclude(id=group['keep'])
+        FundMovement.objects.filter(fee__in=duplicates).update(fee_id=group['keep'])
+        StudentFee.objects.filter(id=group['keep']).update(due_amount=group['due'], paid_amount=group['paid'])
+        duplicates.delete()
+
+
+class Migration(migrations.Migration):
+    """Data only: the unique constraints that need these rows gone are
+    added by 0003_hot_path_indexes. PostgreSQL cannot ALTER a table with
+    deferred FK checks (from ``FundMovement.fee``) still pending in the
+    same transaction, so the cleanup commits in a migration of its own.
+    """
+
+    dependencies = [
+        ('core', '0002_fundmovement'),
+    ]
+
+    operations = [
+        # Not elidable: a squash must keep it ahead of the constraints.
+        migrations.RunPython(drop_duplicates, migrations.RunPython.noop, elidable=False),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-18 02:54
+
+from django.db import migrations
+
+
+def copy_student_beds(apps, schema_editor):
+    """Carry Student.bed over to Bed.student where the two had drifted apart.
+    A bed already pointing at another student keeps that student."""
+    Bed = apps.get_model('core', 'Bed')
+    Student = apps.get_model('core', 'Student')
+    claimed = set(Bed.objects.exclude(student=None).values_list('student_id', flat=True))
+    for student in Student.objects.exclude(bed=None).exclude(id__in=claimed):
+        Bed.objects.filter(pk=student.bed_id, student=None).update(student=student)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_student_beds, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='student',
+            name='bed',
+        ),
+        migrations.RemoveField(
+            model_name='student',
+            name='room',
+        ),
+    ]
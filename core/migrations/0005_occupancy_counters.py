@@ -0,0 +1,50 @@
+# Generated by Django 5.2 on 2026-10-18 02:59
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_beds(apps, schema_editor):
+    Bed = apps.get_model('core', 'Bed')
+    Hostel = apps.get_model('core', 'Hostel')
+    Room = apps.get_model('core', 'Room')
+
+    def bed_count(outer_field, **filters):
+        beds = (
+            Bed.objects.filter(**{outer_field: OuterRef('pk')}, **filters)
+            .order_by().values(outer_field).annotate(n=Count('pk')).values('n')
+        )
+        return Coalesce(Subquery(beds), 0)
+
+    Room.objects.update(occupied_beds=bed_count('room', student__isnull=False))
+    Hostel.objects.update(
+        total_beds=bed_count('room__hostel'),
+        occupied_beds=bed_count('room__hostel', student__isnull=False),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_single_bed_pointer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hostel',
+            name='occupied_beds',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='hostel',
+            name='total_beds',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='occupied_beds',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_beds, migrations.RunPython.noop),
+    ]
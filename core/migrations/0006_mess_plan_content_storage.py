@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-18 03:25
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_occupancy_counters'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='messplan',
+            name='pdf_file',
+            field=models.FileField(storage=core.storage.ContentAddressedStorage(), upload_to='mess_plans/'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-18 03:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_mess_plan_content_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='messplan',
+            name='menu_text',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='messplan',
+            name='thumbnail',
+            field=models.FileField(blank=True, editable=False, upload_to='mess_previews/'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 04:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_job_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='payload',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
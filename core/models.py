@@ -1,8 +1,14 @@
-from django.db import models
+import hashlib
+
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth.models import AbstractUser
+from django.urls import reverse
 from django.utils import timezone
 from decimal import Decimal
 
+from .storage import ContentAddressedStorage
+
 class FeeType(models.Model):
     name = models.CharField(max_length=100)
     periodicity = models.CharField(max_length=20, choices=(
@@ -18,13 +24,38 @@ class Hostel(models.Model):
     address = models.TextField()
     owner = models.ForeignKey('User', on_delete=models.CASCADE, related_name='owned_hostels')
     total_funds = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_beds = models.IntegerField(default=0, editable=False)
+    occupied_beds = models.IntegerField(default=0, editable=False)
 
-    def update_funds(self, amount, is_expense=False):
+    def update_funds(self, amount, is_expense=False, fee=None, expense=None):
+        """Record a fund movement in the ledger and apply it atomically.
+
+        The balance is bumped with an ``F()`` expression so concurrent
+        postings from different workers never overwrite each other.
+        """
+        amount = Decimal(amount)
         if is_expense:
-            self.total_funds -= Decimal(amount)
-        else:
-            self.total_funds += Decimal(amount)
-        self.save()
+            amount = -amount
+        Hostel.post_funds(self.pk, amount, fee=fee, expense=expense)
+        self.total_funds += amount
+
+    @classmethod
+    def post_funds(cls, hostel_id, amount, fee=None, expense=None, kind=None):
+        """Like ``update_funds`` but needs only the hostel id, so callers
+        holding a foreign key don't have to load the hostel row first."""
+        if not amount:
+            return
+        if kind is None:
+            kind = 'expense' if expense is not None else 'fee' if fee is not None else 'adjustment'
+        with transaction.atomic():
+            FundMovement.objects.create(
+                hostel_id=hostel_id,
+                amount=amount,
+                kind=kind,
+                fee=fee,
+                expense=expense,
+            )
+            cls.objects.filter(pk=hostel_id).update(total_funds=F('total_funds') + amount)
     
     def __str__(self):
         return self.name
@@ -40,12 +71,22 @@ class Room(models.Model):
     room_number = models.CharField(max_length=10)
     bed_type = models.CharField(max_length=10, choices=BED_TYPE_CHOICES)
     number_of_beds = models.PositiveIntegerField()
+    occupied_beds = models.IntegerField(default=0, editable=False)
 
     class Meta:
         unique_together = ('hostel', 'room_number')
 
     def available_beds(self):
-        return self.beds.filter(student__isnull=True).count()
+        return self.number_of_beds - self.occupied_beds
+
+    @classmethod
+    def adjust_occupancy(cls, room_id, delta):
+        """Shift the occupied-bed counters of a room and its hostel by ``delta``."""
+        if not delta:
+            return
+        with transaction.atomic():
+            cls.objects.filter(pk=room_id).update(occupied_beds=F('occupied_beds') + delta)
+            Hostel.objects.filter(rooms=room_id).update(occupied_beds=F('occupied_beds') + delta)
 
     def __str__(self):
         return f"{self.room_number} ({self.get_bed_type_display()})"
@@ -55,6 +96,34 @@ class Bed(models.Model):
     bed_number = models.CharField(max_length=10)
     student = models.OneToOneField('Student', on_delete=models.SET_NULL, null=True, blank=True, related_name='assigned_bed')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['room', 'student'], name='bed_room_student_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'student_id' in instance.__dict__:
+            instance._loaded_student_id = instance.student_id
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Keep Room/Hostel occupancy counters in step with this bed.
+        adding = self._state.adding
+        if adding:
+            was_occupied = False
+        elif hasattr(self, '_loaded_student_id'):
+            was_occupied = self._loaded_student_id is not None
+        else:
+            was_occupied = Bed.objects.filter(pk=self.pk, student__isnull=False).exists()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                Hostel.objects.filter(rooms=self.room_id).update(total_beds=F('total_beds') + 1)
+            Room.adjust_occupancy(self.room_id, (self.student_id is not None) - was_occupied)
+        self._loaded_student_id = self.student_id
+
     def __str__(self):
         return f"Bed {self.bed_number} in {self.room}"
 
@@ -81,20 +150,40 @@ class User(AbstractUser):
 class Student(models.Model):
     name = models.CharField(max_length=100)
     hostel = models.ForeignKey(Hostel, on_delete=models.CASCADE, related_name='students')
-    room = models.ForeignKey(Room, on_delete=models.SET_NULL, null=True, blank=True, related_name='occupants')
-    bed = models.OneToOneField(Bed, on_delete=models.SET_NULL, null=True, blank=True, related_name='occupant')
     contact_number = models.CharField(max_length=15, blank=True)
     email = models.EmailField(blank=True)
     enrollment_date = models.DateField(default=timezone.now)
     cnic = models.CharField(max_length=15, blank=True, unique=True, verbose_name="CNIC")
     emergency_contact_number = models.CharField(max_length=15, blank=True, verbose_name="Emergency Contact Number")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['hostel', 'name', 'id'], name='student_hostel_name_idx'),
+        ]
+
+    @property
+    def bed(self):
+        # Bed.student is the single source of truth for occupancy.
+        try:
+            return self.assigned_bed
+        except Bed.DoesNotExist:
+            return None
+
+    @property
+    def room(self):
+        bed = self.bed
+        return bed.room if bed else None
+
     def fee_status(self):
-        return {
-            'security': self.fees.filter(fee_type__name='security').first(),
-            'seat': self.fees.filter(fee_type__name='seat').first(),
-            'mess': self.fees.filter(fee_type__name='mess').first()
-        }
+        """The first fee of each standard type, keyed by type name, from one query."""
+        status = dict.fromkeys(('security', 'seat', 'mess'))
+        first_ids = (
+            self.fees.filter(fee_type__name__in=status)
+            .values('fee_type').annotate(first_id=models.Min('id')).values('first_id')
+        )
+        for fee in StudentFee.objects.filter(pk__in=first_ids).select_related('fee_type'):
+            status[fee.fee_type.name] = fee
+        return status
 
     def __str__(self):
         return self.name
@@ -108,14 +197,45 @@ class StudentFee(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'fee_type', 'period'], name='unique_fee_per_period'),
+        ]
+
     def save(self, *args, **kwargs):
-        if self.pk:  # Update existing fee
-            old_fee = StudentFee.objects.get(pk=self.pk)
-            difference = self.paid_amount - old_fee.paid_amount
-            self.student.hostel.update_funds(difference)
-        else:  # New fee
-            self.student.hostel.update_funds(self.paid_amount)
-        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'paid_amount' not in update_fields:
+            # Nothing that reaches the ledger changes.
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            stored = None
+            if self.pk is not None:
+                # Read the paid amount under a row lock rather than trusting
+                # the value this instance loaded, so concurrent edits of one
+                # fee each post their own delta instead of the same one twice.
+                # The delta has to be taken against the value this save
+                # overwrites, and Django's save() cannot make its UPDATE
+                # conditional on it. The same query fetches the hostel id,
+                # which the posting would otherwise look up on its own, so
+                # an update still costs one SELECT.
+                stored = (
+                    StudentFee.objects.select_for_update(of=('self',))
+                    .filter(pk=self.pk)
+                    .values_list('paid_amount', 'student__hostel_id')
+                    .first()
+                )
+            if stored is None:  # New fee
+                previous = Decimal(0)
+                if StudentFee.student.is_cached(self):
+                    hostel_id = self.student.hostel_id
+                else:
+                    hostel_id = Student.objects.values_list('hostel_id', flat=True).get(pk=self.student_id)
+            else:
+                previous, hostel_id = stored
+            # Kept for the post_save handler, which would otherwise look it up again.
+            self._hostel_id = hostel_id
+            super().save(*args, **kwargs)
+            Hostel.post_funds(hostel_id, Decimal(self.paid_amount) - previous, fee=self)
 
     def __str__(self):
         return f"{self.fee_type} for {self.student} ({self.period})"
@@ -129,9 +249,33 @@ class Expense(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['hostel', 'date'], name='expense_hostel_date_idx'),
+        ]
+
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        self.hostel.update_funds(self.amount, is_expense=True)
+        with transaction.atomic():
+            stored = None
+            if self.pk is not None:
+                # As in StudentFee.save: an edit posts only the change
+                # against the locked stored amount, not the whole amount again.
+                stored = (
+                    Expense.objects.select_for_update()
+                    .filter(pk=self.pk)
+                    .values_list('amount', 'hostel_id')
+                    .first()
+                )
+            super().save(*args, **kwargs)
+            amount = Decimal(self.amount)
+            if stored is None:  # New expense
+                Hostel.post_funds(self.hostel_id, -amount, expense=self)
+            elif stored[1] == self.hostel_id:
+                Hostel.post_funds(self.hostel_id, stored[0] - amount, expense=self)
+            else:
+                # Moved to another hostel: give it back to the old one.
+                Hostel.post_funds(stored[1], stored[0], expense=self)
+                Hostel.post_funds(self.hostel_id, -amount, expense=self)
 
     def __str__(self):
         return f"{self.description} ({self.hostel.name}) on {self.date}"
@@ -139,7 +283,107 @@ class Expense(models.Model):
 class MessPlan(models.Model):
     hostel = models.ForeignKey(Hostel, on_delete=models.CASCADE, related_name='mess_plans')
     month = models.CharField(max_length=7)
-    pdf_file = models.FileField(upload_to='mess_plans/')
+    # Stored once per distinct file, however many plans upload it.
+    pdf_file = models.FileField(upload_to='mess_plans/', storage=ContentAddressedStorage())
+    # Filled in the background from the PDF (see core.mess_previews).
+    menu_text = models.TextField(blank=True, editable=False)
+    thumbnail = models.FileField(upload_to='mess_previews/', blank=True, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['hostel', 'month'], name='unique_mess_plan_per_month'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'pdf_file' in instance.__dict__:
+            instance._loaded_pdf_name = instance.pdf_file.name
+        return instance
+
+    @property
+    def version(self):
+        """Changes whenever a new file is uploaded, so download URLs that
+        carry it can be cached for good."""
+        return hashlib.sha1(self.pdf_file.name.encode()).hexdigest()[:12]
+
+    def get_download_url(self):
+        return f"{reverse('download_mess_plan', args=[self.pk])}?v={self.version}"
+
+    def get_thumbnail_url(self):
+        return f"{reverse('mess_plan_thumbnail', args=[self.pk])}?v={self.version}"
+
+    def __str__(self):
+        return f"Mess Plan for {self.hostel} ({self.month})"
+
+class FundMovement(models.Model):
+    """Append-only ledger of changes to ``Hostel.total_funds``."""
+    KIND_CHOICES = (
+        ('opening', 'Opening Balance'),
+        ('fee', 'Fee Payment'),
+        ('expense', 'Expense'),
+        ('adjustment', 'Adjustment'),
+    )
+
+    hostel = models.ForeignKey(Hostel, on_delete=models.CASCADE, related_name='fund_movements')
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    fee = models.ForeignKey(StudentFee, on_delete=models.SET_NULL, null=True, blank=True, related_name='fund_movements')
+    expense = models.ForeignKey(Expense, on_delete=models.SET_NULL, null=True, blank=True, related_name='fund_movements')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Fund movements are append-only and cannot be modified.")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} of {self.amount} for {self.hostel}"
+
+
+class Job(models.Model):
+    """A unit of background work, run by ``manage.py run_jobs`` (see core.jobs)."""
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    )
+
+    task = models.CharField(max_length=100)
+    kwargs = models.JSONField(default=dict)
+    # Input too large or binary for ``kwargs``, such as an uploaded file. It
+    # lives in the database because workers may not share the web disk.
+    payload = models.BinaryField(null=True, blank=True, editable=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Touched by the process running the job while it is alive; a running
+    # job whose heartbeat has gone quiet lost its worker.
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_queue_idx'),
+        ]
+
+    @property
+    def done(self):
+        return self.status in ('succeeded', 'failed')
+
+    @property
+    def task_label(self):
+        return self.task.replace('_', ' ').capitalize()
+
+    def get_absolute_url(self):
+        return reverse('job_detail', args=[self.pk])
 
     def __str__(self):
-        return f"Mess Plan for {self.hostel} ({self.month})"
\ No newline at end of file
+        return f"{self.task} #{self.pk} ({self.status})"
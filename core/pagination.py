@@ -0,0 +1,101 @@
+"""Keyset (seek) pagination.
+
+Pages are addressed by an opaque cursor holding the ordering values of
+the row at the page edge, so fetching page N costs the same as page 1
+instead of growing with an OFFSET.
+"""
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return the cursor's values, or None if it is missing or malformed."""
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        return None
+    return values if isinstance(values, list) else None
+
+
+def _name(field):
+    return field.lstrip('-')
+
+
+def _cursor_values(cursor, fields, model):
+    """Decode ``cursor`` for ordering ``fields`` of ``model``, or return
+    None unless it holds one well-typed scalar per field."""
+    values = decode_cursor(cursor)
+    if values is None or len(values) != len(fields):
+        return None
+    cleaned = []
+    for field, value in zip(fields, values):
+        if value is None or isinstance(value, (bool, list, dict)):
+            return None
+        try:
+            value = model._meta.get_field(_name(field)).to_python(value)
+        except FieldDoesNotExist:
+            # An annotation; only the scalar check above applies.
+            pass
+        except ValidationError:
+            return None
+        cleaned.append(value)
+    return cleaned
+
+
+def _flip(field):
+    return _name(field) if field.startswith('-') else f'-{field}'
+
+
+def _seek(fields, values, forward):
+    # (a, b) > (x, y)  ==  a > x OR (a = x AND b > y); a '-' field sorts
+    # descending, so moving forward along it means going down.
+    condition = Q()
+    for i, field in enumerate(fields):
+        equal = {_name(f): v for f, v in zip(fields[:i], values[:i])}
+        op = 'gt' if forward != field.startswith('-') else 'lt'
+        condition |= Q(**equal, **{f'{_name(field)}__{op}': values[i]})
+    return condition
+
+
+def keyset_page(queryset, fields, after=None, before=None, size=50):
+    """Return ``{'items', 'next_cursor', 'prev_cursor'}`` for one page.
+
+    ``fields`` is the ordering (``'-field'`` for descending) and must end
+    with a unique field (usually ``'id'``) so every row has a distinct
+    position. Rows may be model instances or ``values()`` dicts.
+    """
+    after = _cursor_values(after, fields, queryset.model)
+    before = _cursor_values(before, fields, queryset.model)
+    if before:
+        rows = list(
+            queryset.filter(_seek(fields, before, forward=False))
+            .order_by(*[_flip(f) for f in fields])[:size + 1]
+        )
+        has_more_before, has_more_after = len(rows) > size, True
+        items = rows[:size][::-1]
+    else:
+        if after:
+            queryset = queryset.filter(_seek(fields, after, forward=True))
+        rows = list(queryset.order_by(*fields)[:size + 1])
+        has_more_before, has_more_after = after is not None, len(rows) > size
+        items = rows[:size]
+
+    def cursor(obj):
+        if isinstance(obj, dict):
+            return encode_cursor([obj[_name(f)] for f in fields])
+        return encode_cursor([getattr(obj, _name(f)) for f in fields])
+
+    return {
+        'items': items,
+        'next_cursor': cursor(items[-1]) if items and has_more_after else None,
+        'prev_cursor': cursor(items[0]) if items and has_more_before else None,
+    }
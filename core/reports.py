@@ -0,0 +1,149 @@
+"""Set-based dashboard reports.
+
+Each function runs a fixed number of grouped queries and returns plain
+dicts, so dashboard cost depends on the number of hostels rather than on
+the number of rooms, students or fees behind them.
+"""
+from decimal import Decimal
+
+from django.db.models import F, Sum
+
+from .models import Expense, Room, Student, StudentFee
+from .pagination import keyset_page
+
+
+def build_fee_matrix(fees):
+    """Map student id -> lowercased fee type name -> StudentFee in one query.
+
+    Fees are read in period order so the most recent period of a fee type
+    wins, matching what the dashboard shows per student.
+    """
+    matrix = {}
+    for fee in fees.select_related('fee_type').order_by('student_id', 'period', 'id'):
+        matrix.setdefault(fee.student_id, {})[fee.fee_type.name.lower()] = fee
+    return matrix
+
+
+def seat_availability(hostels):
+    rooms = (
+        Room.objects.filter(hostel__in=hostels)
+        .values('hostel__name', 'room_number', 'number_of_beds', 'occupied_beds')
+        .order_by('hostel__name', 'room_number')
+    )
+    return [
+        {
+            'hostel': room['hostel__name'],
+            'room': room['room_number'],
+            'total_beds': room['number_of_beds'],
+            'occupied': room['occupied_beds'],
+            'available': room['number_of_beds'] - room['occupied_beds'],
+        }
+        for room in rooms
+    ]
+
+
+def unpaid_students(hostels):
+    students = (
+        Student.objects.filter(hostel__in=hostels, fees__paid_amount__lt=F('fees__due_amount'))
+        .values('id', 'name', 'hostel__name')
+        .annotate(pending=Sum('fees__due_amount') - Sum('fees__paid_amount'))
+        .filter(pending__gt=0)
+        .order_by('hostel__name', 'name')
+    )
+    return [
+        {
+            'student': student['name'],
+            'hostel': student['hostel__name'],
+            'pending_amount': student['pending'],
+        }
+        for student in students
+    ]
+
+
+def hostel_revenue(hostels):
+    fees = dict(
+        StudentFee.objects.filter(student__hostel__in=hostels)
+        .values('student__hostel')
+        .annotate(total=Sum('paid_amount'))
+        .values_list('student__hostel', 'total')
+    )
+    expenses = dict(
+        Expense.objects.filter(hostel__in=hostels)
+        .values('hostel')
+        .annotate(total=Sum('amount'))
+        .values_list('hostel', 'total')
+    )
+    report = []
+    for hostel in hostels:
+        collected = fees.get(hostel.id) or 0
+        spent = expenses.get(hostel.id) or 0
+        report.append({
+            'hostel': hostel.name,
+            'fees_collected': collected,
+            'expenses': spent,
+            'revenue': collected - spent,
+        })
+    return report
+
+
+def owner_summary(hostels):
+    """All owner dashboard figures for ``hostels`` (a list of Hostel)."""
+    revenue = hostel_revenue(hostels)
+    security_fees = StudentFee.objects.filter(
+        student__hostel__in=hostels, fee_type__name__iexact='security'
+    ).aggregate(total=Sum('paid_amount'))['total'] or 0
+    expenses_by_category = list(
+        Expense.objects.filter(hostel__in=hostels)
+        .values('category__name')
+        .annotate(total=Sum('amount'))
+        .order_by('category__name')
+    )
+    return {
+        'seat_availability': seat_availability(hostels),
+        'unpaid_students': unpaid_students(hostels),
+        'expenses_by_category': expenses_by_category,
+        'security_fees': security_fees,
+        'total_revenue': sum((row['revenue'] for row in revenue), Decimal('0')),
+        'hostel_revenue': revenue,
+    }
+
+
+def fee_statement(student, after=None, before=None, size=12):
+    """One page of ``student``'s fee statement, newest period first.
+
+    Each page row is a period with its due, paid and outstanding sums from
+    one grouped query, plus the fees itemised under it, read for the
+    periods on the page only. One-time fees, which have no period, are
+    listed separately under ``one_time`` on every page, and ``totals``
+    covers every fee.
+    """
+    fees = StudentFee.objects.filter(student=student)
+    periods = (
+        fees.filter(period__isnull=False)
+        .values('period')
+        .annotate(due=Sum('due_amount'), paid=Sum('paid_amount'))
+        .annotate(outstanding=F('due') - F('paid'))
+    )
+    page = keyset_page(periods, ('-period',), after=after, before=before, size=size)
+
+    items = {}
+    page_fees = (
+        fees.filter(period__in=[row['period'] for row in page['items']])
+        .select_related('fee_type')
+        .order_by('fee_type__name', 'id')
+    )
+    for fee in page_fees:
+        items.setdefault(fee.period, []).append(fee)
+    for row in page['items']:
+        row['fees'] = items.get(row['period'], [])
+
+    one_time = list(
+        fees.filter(period__isnull=True)
+        .annotate(outstanding=F('due_amount') - F('paid_amount'))
+        .select_related('fee_type')
+        .order_by('fee_type__name', 'id')
+    )
+
+    totals = fees.aggregate(due=Sum('due_amount'), paid=Sum('paid_amount'))
+    due, paid = totals['due'] or Decimal('0'), totals['paid'] or Decimal('0')
+    return {**page, 'one_time': one_time, 'totals': {'due': due, 'paid': paid, 'outstanding': due - paid}}
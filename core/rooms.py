@@ -0,0 +1,65 @@
+"""Bulk room and bed creation.
+
+Rooms and beds are inserted with ``bulk_create``, so neither ``Bed.save``
+nor the model signals run; the hostel's bed total and dashboard cache
+are updated once per call instead.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .caching import invalidate_hostel
+from .models import Bed, Hostel, Room
+
+
+class RoomBuildError(Exception):
+    pass
+
+
+def create_beds(rooms):
+    """Create beds 1..number_of_beds for each saved room in ``rooms``."""
+    if not rooms:
+        return []
+    beds = [
+        Bed(room=room, bed_number=str(number))
+        for room in rooms
+        for number in range(1, room.number_of_beds + 1)
+    ]
+    with transaction.atomic():
+        Bed.objects.bulk_create(beds, batch_size=1000)
+        Hostel.objects.filter(pk=rooms[0].hostel_id).update(total_beds=F('total_beds') + len(beds))
+    invalidate_hostel(rooms[0].hostel_id)
+    return beds
+
+
+def room_numbers(start, end, prefix=''):
+    return [f'{prefix}{number}' for number in range(start, end + 1)]
+
+
+def _taken(hostel, numbers):
+    return sorted(
+        Room.objects.filter(hostel=hostel, room_number__in=numbers)
+        .values_list('room_number', flat=True)
+    )
+
+
+def create_room_range(hostel, numbers, bed_type):
+    """Create a ``bed_type`` room with its beds for each of ``numbers``.
+
+    Raises RoomBuildError, creating nothing, if any number is already
+    used in the hostel.
+    """
+    beds_per_room = int(bed_type.split('-')[0])
+    try:
+        with transaction.atomic():
+            taken = _taken(hostel, numbers)
+            if taken:
+                raise RoomBuildError("Rooms already exist: " + ", ".join(taken))
+            rooms = Room.objects.bulk_create([
+                Room(hostel=hostel, room_number=number, bed_type=bed_type, number_of_beds=beds_per_room)
+                for number in numbers
+            ], batch_size=1000)
+            create_beds(rooms)
+    except IntegrityError:
+        # Another request created some of the numbers after the check above.
+        raise RoomBuildError("Rooms already exist: " + ", ".join(_taken(hostel, numbers)))
+    return rooms
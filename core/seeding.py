@@ -0,0 +1,204 @@
+"""Synthetic hostel data for benchmarks and load tests.
+
+Everything is inserted with ``bulk_create`` in batches, so the per-row
+side effects of ``StudentFee.save``/``Expense.save``/``Bed.save`` are
+skipped; each hostel's funds are posted once and the occupancy counters
+reconciled once at the end instead. All random choices come from one
+``random.Random(seed)``, so the same arguments always produce the same
+data.
+"""
+import base64
+import io
+import math
+import random
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import transaction
+
+from .models import Bed, Expense, ExpenseCategory, FeeType, Hostel, Job, MessPlan, Room, Student, StudentFee, User
+from .rooms import create_room_range
+
+PASSWORD = 'seed-pass'
+USERNAME_PREFIX = 'seed-'
+FIRST_NAMES = ['Ali', 'Ahmed', 'Bilal', 'Hamza', 'Usman', 'Ayesha', 'Fatima', 'Hira', 'Sana', 'Zainab']
+LAST_NAMES = ['Khan', 'Malik', 'Butt', 'Qureshi', 'Sheikh', 'Chaudhry', 'Raza', 'Siddiqui', 'Iqbal', 'Mirza']
+EXPENSE_CATEGORIES = ['Utilities', 'Maintenance', 'Groceries', 'Salaries', 'Internet']
+MONTHLY_FEES = {'seat': (8000, 15000), 'mess': (6000, 10000)}
+SECURITY_FEE = Decimal('10000')
+MENU_TEXT = "Monday: Daal Chawal\nTuesday: Chicken Karahi\nWednesday: Aloo Keema"
+MENU_PDF = b'%PDF-1.4\n% Seeded mess plan\n%%EOF\n'
+# A 1x1 PNG standing in for a rendered thumbnail.
+MENU_THUMBNAIL = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=='
+)
+
+
+def fee_types():
+    types = {}
+    for name, periodicity in (('security', 'one-time'), ('seat', 'monthly'), ('mess', 'monthly')):
+        types[name] = FeeType.objects.filter(name=name).first() or FeeType.objects.create(
+            name=name, periodicity=periodicity
+        )
+    return types
+
+
+def periods_before(month, count):
+    """Return ``count`` YYYY-MM periods ending with ``month``, oldest first."""
+    year, mon = map(int, month.split('-'))
+    index = year * 12 + mon - 1
+    return [f'{i // 12:04d}-{i % 12 + 1:02d}' for i in range(index - count + 1, index + 1)]
+
+
+def _paid(rng, due, latest):
+    # Older periods are mostly settled; the latest is often still open.
+    roll = rng.random()
+    if roll < (0.4 if latest else 0.85):
+        return due
+    if roll < (0.7 if latest else 0.95):
+        return (due * Decimal(rng.randint(1, 9)) / 10).quantize(Decimal('1'))
+    return Decimal('0')
+
+
+def _build_rooms(rng, hostel, h, beds_needed, batch_size):
+    """Create rooms of random bed types until they hold ``beds_needed`` beds."""
+    bed_types = [choice for choice, _ in Room.BED_TYPE_CHOICES]
+    by_type, beds, number = {}, 0, 0
+    while beds < beds_needed:
+        number += 1
+        bed_type = rng.choice(bed_types)
+        by_type.setdefault(bed_type, []).append(number)
+        beds += int(bed_type.split('-')[0])
+    for bed_type, numbers in by_type.items():
+        for i in range(0, len(numbers), batch_size):
+            chunk = numbers[i:i + batch_size]
+            create_room_range(hostel, [f'{h}-{n}' for n in chunk], bed_type)
+
+
+def _seed_students(rng, hostel, h, count, months, types, batch_size):
+    """Insert ``count`` students with beds and fee history.
+
+    Returns the total paid across the new fees and the first student.
+    """
+    paid_total = Decimal('0')
+    first_student = None
+    start_year, start_month = map(int, months[0].split('-'))
+    for offset in range(0, count, batch_size):
+        students = Student.objects.bulk_create([
+            Student(
+                name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                hostel=hostel,
+                cnic=f'{h:05d}-{i + 1:07d}-{rng.randint(0, 9)}',
+                contact_number=f'+92{rng.randint(3000000000, 3499999999)}',
+                emergency_contact_number=f'+92{rng.randint(3000000000, 3499999999)}',
+                enrollment_date=date(start_year, start_month, rng.randint(1, 28)),
+            )
+            for i in range(offset, min(offset + batch_size, count))
+        ])
+        first_student = first_student or students[0]
+
+        beds = list(
+            Bed.objects.filter(room__hostel=hostel, student__isnull=True).order_by('id')[:len(students)]
+        )
+        for bed, student in zip(beds, students):
+            bed.student = student
+        Bed.objects.bulk_update(beds, ['student'])
+
+        fees = []
+        for student in students:
+            fees.append(StudentFee(student=student, fee_type=types['security'], due_amount=SECURITY_FEE,
+                                   paid_amount=_paid(rng, SECURITY_FEE, latest=False)))
+            for i, period in enumerate(months):
+                for name, (low, high) in MONTHLY_FEES.items():
+                    due = Decimal(rng.randrange(low, high + 1, 500))
+                    fees.append(StudentFee(student=student, fee_type=types[name], period=period, due_amount=due,
+                                           paid_amount=_paid(rng, due, latest=i == len(months) - 1)))
+        for i in range(0, len(fees), batch_size):
+            StudentFee.objects.bulk_create(fees[i:i + batch_size])
+        paid_total += sum(fee.paid_amount for fee in fees)
+    return paid_total, first_student
+
+
+def _seed_expenses(rng, hostel, months, categories, batch_size):
+    expenses = []
+    for period in months:
+        year, mon = map(int, period.split('-'))
+        for _ in range(rng.randint(2, 6)):
+            category = rng.choice(categories)
+            expenses.append(Expense(
+                hostel=hostel,
+                category=category,
+                description=f'{category.name} {period}',
+                amount=Decimal(rng.randrange(1000, 50001, 100)),
+                date=date(year, mon, rng.randint(1, 28)),
+            ))
+    Expense.objects.bulk_create(expenses, batch_size=batch_size)
+    return sum(expense.amount for expense in expenses)
+
+
+def _seed_mess_plans(hostels, month):
+    """Give every hostel a mess plan for ``month`` with its preview built,
+    all sharing one stored PDF and thumbnail as identical uploads would."""
+    pdf_file = MessPlan._meta.get_field('pdf_file')
+    pdf_name = pdf_file.storage.save(pdf_file.generate_filename(None, 'menu.pdf'), ContentFile(MENU_PDF))
+    thumbnail = default_storage.save('mess_previews/seed.png', ContentFile(MENU_THUMBNAIL))
+    MessPlan.objects.bulk_create([
+        MessPlan(hostel=hostel, month=month, pdf_file=pdf_name, menu_text=MENU_TEXT, thumbnail=thumbnail)
+        for hostel in hostels
+    ])
+
+
+def seed_hostels(hostels=1, students=100, periods=3, month='2025-05', seed=0, batch_size=1000, password=PASSWORD):
+    """Create ``hostels`` hostels sharing ``students`` students between them.
+
+    Each hostel gets a warden, rooms of random bed types with enough beds
+    for its students (all allocated), a security fee per student, seat
+    and mess fees for the last ``periods`` months ending with ``month``,
+    a few expenses per month and a mess plan for ``month``; the plan's
+    files go to the configured storage. Every user gets ``password``.
+    Returns the users to log in as, keyed by role.
+    """
+    rng = random.Random(seed)
+    hashed = make_password(password)
+    types = fee_types()
+    categories = [ExpenseCategory.objects.get_or_create(name=name)[0] for name in EXPENSE_CATEGORIES]
+    months = periods_before(month, periods)
+    per_hostel = math.ceil(students / hostels) if hostels else 0
+
+    with transaction.atomic():
+        owner = User.objects.create(username=f'{USERNAME_PREFIX}owner', password=hashed, role='Owner')
+        admin = User.objects.create(username=f'{USERNAME_PREFIX}admin', password=hashed, role='Admin')
+        users = {'Owner': owner, 'Admin': admin, 'Warden': None, 'Student': None}
+        created = []
+        for h in range(1, hostels + 1):
+            hostel = Hostel.objects.create(name=f'Hostel {h}', address=f'{h} Seed Road', owner=owner)
+            created.append(hostel)
+            warden = User.objects.create(
+                username=f'{USERNAME_PREFIX}warden-{h}', password=hashed, role='Warden', hostel=hostel
+            )
+            users['Warden'] = users['Warden'] or warden
+            count = max(0, min(per_hostel, students - (h - 1) * per_hostel))
+
+            _build_rooms(rng, hostel, h, count, batch_size)
+            paid, first_student = _seed_students(rng, hostel, h, count, months, types, batch_size)
+            spent = _seed_expenses(rng, hostel, months, categories, batch_size)
+            Hostel.post_funds(hostel.id, paid - spent)
+            # A finished fee run, so the warden has a job page to look at.
+            Job.objects.create(
+                task='generate_monthly_fees', status='succeeded', attempts=1, created_by=warden,
+                kwargs={'hostel_id': hostel.id, 'period': month, 'amounts': {}},
+                result={'summary': f"Generated 0 fee(s) for {month}", 'created': 0},
+            )
+
+            if users['Student'] is None and first_student is not None:
+                users['Student'] = User.objects.create(
+                    username=f'{USERNAME_PREFIX}student-{h}', password=hashed, role='Student',
+                    student=first_student,
+                )
+        _seed_mess_plans(created, month)
+        call_command('reconcile_occupancy', stdout=io.StringIO())
+    return users
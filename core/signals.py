@@ -0,0 +1,85 @@
+from django.db.models import F, Sum
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .caching import invalidate_hostel
+from .jobs import enqueue
+from .models import Bed, Expense, FundMovement, Hostel, MessPlan, Room, Student, StudentFee
+
+
+def _hostel_id(instance, field):
+    """The hostel id behind ``instance.<field>``, read from the cached
+    related object when there is one and otherwise with a single-column
+    lookup rather than loading the whole row."""
+    descriptor = getattr(type(instance), field)
+    if descriptor.is_cached(instance):
+        return getattr(instance, field).hostel_id
+    related = descriptor.field.related_model.objects.filter(pk=getattr(instance, descriptor.field.attname))
+    return related.values_list('hostel_id', flat=True).first()
+
+
+def _invalidate(hostel_id):
+    # None when the related row went first in a cascade; its own signal
+    # has invalidated the hostel already.
+    if hostel_id is not None:
+        invalidate_hostel(hostel_id)
+
+
+@receiver([post_save, post_delete], sender=StudentFee)
+def fee_changed(sender, instance, signal, raw=False, **kwargs):
+    if raw:
+        return
+    # StudentFee.save reads the hostel along with the row it locks; other
+    # saves and deletes look it up.
+    hostel_id = getattr(instance, '_hostel_id', None)
+    _invalidate(hostel_id if hostel_id is not None else _hostel_id(instance, 'student'))
+
+
+@receiver([post_save, post_delete], sender=Expense)
+@receiver([post_save, post_delete], sender=Student)
+@receiver([post_save, post_delete], sender=Room)
+def hostel_record_changed(sender, instance, **kwargs):
+    invalidate_hostel(instance.hostel_id)
+
+
+@receiver([post_save, post_delete], sender=Bed)
+def bed_changed(sender, instance, **kwargs):
+    _invalidate(_hostel_id(instance, 'room'))
+
+
+@receiver(post_delete, sender=Bed)
+def bed_deleted(sender, instance, **kwargs):
+    Hostel.objects.filter(rooms=instance.room_id).update(total_beds=F('total_beds') - 1)
+    if instance.student_id is not None:
+        Room.adjust_occupancy(instance.room_id, -1)
+
+
+@receiver(pre_delete, sender=Expense)
+def expense_deleted(sender, instance, origin=None, **kwargs):
+    # Give back what the ledger holds against the expense. When a hostel
+    # (or its owner) is deleted with everything in it, there is no balance
+    # left to put right.
+    if getattr(origin, 'model', type(origin)) is not Expense:
+        return
+    posted = FundMovement.objects.filter(expense=instance).aggregate(total=Sum('amount'))['total']
+    if posted:
+        Hostel.post_funds(instance.hostel_id, -posted, kind='expense')
+
+
+@receiver(pre_delete, sender=Student)
+def student_deleted(sender, instance, **kwargs):
+    # Bed.student is cleared with a plain UPDATE (SET_NULL), which the
+    # Bed.save bookkeeping never sees.
+    room_id = Bed.objects.filter(student=instance).values_list('room_id', flat=True).first()
+    if room_id is not None:
+        Room.adjust_occupancy(room_id, -1)
+
+
+@receiver(post_save, sender=MessPlan)
+def mess_plan_saved(sender, instance, created, **kwargs):
+    if created or instance.pdf_file.name != getattr(instance, '_loaded_pdf_name', None):
+        if not created:
+            # Drop the old file's preview rather than show it for the new one.
+            MessPlan.objects.filter(pk=instance.pk).update(menu_text='', thumbnail='')
+        instance._loaded_pdf_name = instance.pdf_file.name
+        enqueue('build_mess_preview', plan_id=instance.pk)
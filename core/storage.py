@@ -0,0 +1,87 @@
+"""Content-addressed file storage.
+
+Uploads are hashed while they are written to a temporary file, then
+renamed to ``<upload_to>/<sha256><ext>``. Uploading a file that is
+already stored keeps the existing copy, so any number of rows can share
+one blob. Nothing deletes blobs when rows go away; ``manage.py
+gc_mess_plans`` removes the ones no row refers to any more.
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+TEMP_PREFIX = '.upload-'
+BLOB_NAME_RE = re.compile(r'^[0-9a-f]{64}(\.\w+)?$')
+
+
+class BlobWriter:
+    """Writes one blob chunk by chunk; ``commit`` returns its stored name."""
+
+    def __init__(self, storage, directory, extension):
+        self.storage = storage
+        self.directory = directory
+        self.extension = extension.lower()
+        self.size = 0
+        self._digest = hashlib.sha256()
+        full_directory = storage.path(directory)
+        os.makedirs(full_directory, exist_ok=True)
+        fd, self._temp_path = tempfile.mkstemp(dir=full_directory, prefix=TEMP_PREFIX)
+        self._file = os.fdopen(fd, 'wb')
+
+    def write(self, chunk):
+        self._digest.update(chunk)
+        self._file.write(chunk)
+        self.size += len(chunk)
+
+    def commit(self, stem=None):
+        """Move the file into place and return its name. ``stem`` stores it
+        under that name instead of the content digest, for files keyed by
+        something else, such as the source a preview was rendered from."""
+        self._file.close()
+        blob = (stem or self._digest.hexdigest()) + self.extension
+        name = f'{self.directory}/{blob}' if self.directory else blob
+        path = self.storage.path(name)
+        if os.path.exists(path):
+            # Refresh the mtime so the blob is inside the GC grace period
+            # until the row that now refers to it has been saved.
+            os.utime(path)
+            os.remove(self._temp_path)
+        else:
+            if self.storage.file_permissions_mode is not None:
+                os.chmod(self._temp_path, self.storage.file_permissions_mode)
+            os.replace(self._temp_path, path)
+        return name
+
+    def discard(self):
+        self._file.close()
+        if os.path.exists(self._temp_path):
+            os.remove(self._temp_path)
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # The real name is only known once _save has hashed the content,
+        # and a file already stored under it holds the same bytes.
+        return name
+
+    def blob_writer(self, name):
+        """Start writing a blob for an upload that would be stored as ``name``."""
+        return BlobWriter(self, os.path.dirname(name), os.path.splitext(name)[1])
+
+    def _save(self, name, content):
+        writer = self.blob_writer(name)
+        try:
+            for chunk in content.chunks():
+                writer.write(chunk)
+            return writer.commit()
+        except BaseException:
+            writer.discard()
+            raise
+
+    def is_blob(self, name):
+        return bool(BLOB_NAME_RE.match(os.path.basename(name)))
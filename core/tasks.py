@@ -0,0 +1,39 @@
+"""Background tasks for ``core.jobs``.
+
+Each task returns a JSON-serialisable dict; ``summary`` is shown on the
+job page and any ``errors`` are listed under it as ``(row, message)``.
+"""
+import csv
+
+from django.core.files.base import ContentFile
+
+from . import billing, imports, mess_previews
+from .jobs import task
+from .models import Hostel
+
+
+@task
+def generate_monthly_fees(hostel_id, period, amounts):
+    hostel = Hostel.objects.get(pk=hostel_id)
+    created = billing.generate_monthly_fees(hostel, period, amounts)
+    return {'summary': f"Generated {created} fee(s) for {period}", 'created': created}
+
+
+@task
+def import_students(hostel_id, filename, payload):
+    """Import the students in an uploaded file, passed as ``payload`` bytes."""
+    hostel = Hostel.objects.get(pk=hostel_id)
+    try:
+        result = imports.import_students(hostel, imports.read_rows(ContentFile(payload, name=filename)))
+    except (ValueError, csv.Error) as e:
+        return {'summary': f"Could not read file: {e}", 'created': 0, 'errors': []}
+    result['summary'] = f"Imported {result['created']} student(s)"
+    if result['errors']:
+        result['summary'] += f"; {len(result['errors'])} row(s) were skipped"
+    return result
+
+
+@task
+def build_mess_preview(plan_id):
+    built = mess_previews.build_preview(plan_id)
+    return {'summary': "Preview built" if built else "No preview was built"}
@@ -10,4 +10,6 @@ def subtract(value, arg):
 def keyvalue(dictionary, key):
     if not dictionary or not isinstance(dictionary, dict):
         return {}
+    if key in dictionary:
+        return dictionary[key]
     return dictionary.get(str(key), {})
\ No newline at end of file
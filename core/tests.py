@@ -1,3 +1,1416 @@
-from django.test import TestCase
+import hashlib
+import importlib.util
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipIf, skipUnless
 
-# Create your tests here.
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core import serializers
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Sum
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import billing, caching, checks, imports, jobs, reports
+from .benchmarks import check_budgets, run_benchmarks
+from .forms import RoomAllocationForm
+from .allocation import AllocationError, allocate_bed, apply_allocation, plan_allocation, unassigned_requests
+from .downloads import parse_range
+from .mess_previews import build_preview
+from .pagination import encode_cursor, keyset_page
+from .middleware import RequestProfile
+from .seeding import seed_hostels
+from .rooms import RoomBuildError, create_beds, create_room_range, room_numbers
+from .models import Bed, Expense, FeeType, FundMovement, Hostel, Job, MessPlan, Room, Student, StudentFee, User
+
+# Tests run in one process, so a local cache is shared by every request.
+LOCAL_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class HostelFixtureMixin:
+    """Builds an owner, a hostel with a warden and the standard fee types."""
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username='owner', password='pass', role='Owner')
+        self.hostel = Hostel.objects.create(name='North', address='1 Road', owner=self.owner)
+        self.warden = User.objects.create_user(
+            username='warden', password='pass', role='Warden', hostel=self.hostel
+        )
+        self.fee_types = {
+            'security': FeeType.objects.create(name='security', periodicity='one-time'),
+            'seat': FeeType.objects.create(name='seat', periodicity='monthly'),
+            'mess': FeeType.objects.create(name='mess', periodicity='monthly'),
+        }
+        self.room_count = 0
+
+    def add_room(self, beds=3):
+        self.room_count += 1
+        room = Room.objects.create(
+            hostel=self.hostel, room_number=str(100 + self.room_count),
+            bed_type=f'{beds}-bed', number_of_beds=beds,
+        )
+        for i in range(1, beds + 1):
+            Bed.objects.create(room=room, bed_number=i)
+        return room
+
+    def add_students(self, count, hostel=None):
+        hostel = hostel or self.hostel
+        start = Student.objects.count()
+        students = []
+        for i in range(start, start + count):
+            student = Student.objects.create(name=f'Student {i}', hostel=hostel, cnic=f'35202-{i:07d}-1')
+            room = self.add_room(beds=1) if hostel == self.hostel else None
+            if room:
+                bed = room.beds.get()
+                bed.student = student
+                bed.save()
+            StudentFee.objects.create(
+                student=student, fee_type=self.fee_types['security'],
+                due_amount=Decimal('5000'), paid_amount=Decimal('5000'),
+            )
+            for fee_type in ('seat', 'mess'):
+                StudentFee.objects.create(
+                    student=student, fee_type=self.fee_types[fee_type], period='2025-05',
+                    due_amount=Decimal('1000'), paid_amount=Decimal('400'),
+                )
+            students.append(student)
+        return students
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+
+class WardenDashboardQueryTests(HostelFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.login(username='warden', password='pass')
+        self.url = reverse('warden_dashboard')
+
+    def test_query_count_does_not_grow_with_students(self):
+        self.add_students(1)
+        baseline = self.count_queries(self.url)
+        self.add_students(25)
+        self.assertEqual(self.count_queries(self.url), baseline)
+
+    def test_fee_matrix_rendered_per_student(self):
+        student = self.add_students(1)[0]
+        response = self.client.get(self.url)
+        matrix = response.context['fees_summary']
+        self.assertEqual(set(matrix[student.id]), {'security', 'seat', 'mess'})
+        self.assertContains(response, 'Due: 1000.00, Paid: 400.00')
+
+
+class OwnerDashboardReportTests(HostelFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = Hostel.objects.create(name='South', address='2 Road', owner=self.owner)
+        self.client.login(username='owner', password='pass')
+        self.url = reverse('owner_dashboard')
+
+    def test_query_count_does_not_grow_with_students(self):
+        self.add_students(1)
+        self.add_students(1, hostel=self.other)
+        baseline = self.count_queries(self.url)
+        self.add_students(15)
+        self.add_students(15, hostel=self.other)
+        self.assertEqual(self.count_queries(self.url), baseline)
+
+    def test_owned_hostels_read_once(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        self.assertContains(response, f'<option value="{self.other.pk}">South</option>', html=True)
+        hostel_reads = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('SELECT "core_hostel"."id"')]
+        self.assertEqual(len(hostel_reads), 1)
+
+    def test_summary_figures(self):
+        self.add_students(2)
+        self.add_students(1, hostel=self.other)
+        summary = reports.owner_summary([self.hostel, self.other])
+        self.assertEqual(len(summary['unpaid_students']), 3)
+        self.assertEqual(summary['unpaid_students'][0]['pending_amount'], Decimal('1200'))
+        self.assertEqual(summary['security_fees'], Decimal('15000'))
+        self.assertEqual(summary['total_revenue'], Decimal('17400'))
+        revenue = {row['hostel']: row['fees_collected'] for row in summary['hostel_revenue']}
+        self.assertEqual(revenue, {'North': Decimal('11600'), 'South': Decimal('5800')})
+        self.assertEqual(
+            [row['occupied'] for row in summary['seat_availability']], [1, 1]
+        )
+
+
+class FundLedgerTests(HostelFixtureMixin, TestCase):
+    def test_stale_instances_do_not_lose_updates(self):
+        first = Hostel.objects.get(pk=self.hostel.pk)
+        second = Hostel.objects.get(pk=self.hostel.pk)
+        first.update_funds(100)
+        second.update_funds(50)
+        second.update_funds(30, is_expense=True)
+        self.hostel.refresh_from_db()
+        self.assertEqual(self.hostel.total_funds, Decimal('120'))
+        self.assertEqual(FundMovement.objects.filter(hostel=self.hostel).count(), 3)
+
+    def test_fee_and_expense_post_to_ledger(self):
+        student = self.add_students(1)[0]
+        fee = student.fees.get(fee_type__name='seat')
+        fee.paid_amount = Decimal('1000')
+        fee.save()
+        Expense.objects.create(hostel=self.hostel, description='Gas', amount=Decimal('700'))
+        self.hostel.refresh_from_db()
+        self.assertEqual(self.hostel.total_funds, Decimal('5700'))
+        self.assertEqual(fee.fund_movements.get(amount=Decimal('600')).kind, 'fee')
+        self.assertEqual(
+            FundMovement.objects.filter(kind='expense').get().amount, Decimal('-700')
+        )
+
+    def test_expense_edits_post_only_the_change(self):
+        expense = Expense.objects.create(hostel=self.hostel, description='Gas', amount=Decimal('700'))
+        expense = Expense.objects.get(pk=expense.pk)
+        expense.amount = Decimal('900')
+        expense.save()
+        expense.description = 'Gas cylinders'
+        expense.save()
+        self.hostel.refresh_from_db()
+        self.assertEqual(self.hostel.total_funds, Decimal('-900'))
+        self.assertEqual(
+            sorted(expense.fund_movements.values_list('amount', flat=True)), [Decimal('-700'), Decimal('-200')]
+        )
+
+        expense.delete()
+        self.hostel.refresh_from_db()
+        self.assertEqual(self.hostel.total_funds, Decimal('0'))
+        out = StringIO()
+        call_command('reconcile_funds', '--dry-run', stdout=out)
+        self.assertIn("0 would be corrected", out.getvalue())
+
+        Expense.objects.create(hostel=self.hostel, description='Rent', amount=Decimal('50'))
+        self.hostel.delete()
+        self.assertFalse(FundMovement.objects.exists())
+
+    def test_ledger_is_append_only(self):
+        self.hostel.update_funds(10)
+        movement = FundMovement.objects.get()
+        movement.amount = Decimal('20')
+        with self.assertRaises(ValueError):
+            movement.save()
+
+    def test_reconcile_funds_repairs_drift(self):
+        self.add_students(1)
+        Hostel.objects.filter(pk=self.hostel.pk).update(total_funds=Decimal('1'))
+        call_command('reconcile_funds', '--dry-run', stdout=StringIO())
+        self.hostel.refresh_from_db()
+        self.assertEqual(self.hostel.total_funds, Decimal('1'))
+        call_command('reconcile_funds', stdout=StringIO())
+        self.hostel.refresh_from_db()
+        self.assertEqual(self.hostel.total_funds, Decimal('5800'))
+
+
+class StudentFeeSaveTests(HostelFixtureMixin, TestCase):
+    def test_update_reads_stored_amount_without_loading_student(self):
+        self.add_students(1)
+        fee = StudentFee.objects.get(fee_type__name='mess')
+        fee.paid_amount = Decimal('900')
+        with CaptureQueriesContext(connection) as ctx:
+            fee.save()
+        statements = [q['sql'].split()[0].upper() for q in ctx.captured_queries]
+        self.assertEqual(statements.count('SELECT'), 1)
+        self.assertEqual(statements.count('UPDATE'), 2)
+        self.hostel.refresh_from_db()
+        self.assertEqual(self.hostel.total_funds, Decimal('6300'))
+
+    def test_saving_other_fields_skips_the_ledger(self):
+        self.add_students(1)
+        fee = StudentFee.objects.get(fee_type__name='mess')
+        fee.due_amount = Decimal('1500')
+        with CaptureQueriesContext(connection) as ctx:
+            fee.save(update_fields=['due_amount', 'updated_at'])
+        self.assertFalse(any('core_fundmovement' in q['sql'] for q in ctx.captured_queries))
+        self.assertEqual([q['sql'].split()[0].upper() for q in ctx.captured_queries if 'core_studentfee' in q['sql']], ['UPDATE'])
+        self.assertEqual(StudentFee.objects.get(pk=fee.pk).due_amount, Decimal('1500'))
+
+    def test_repeated_saves_post_only_new_delta(self):
+        self.add_students(1)
+        fee = StudentFee.objects.get(fee_type__name='mess')
+        fee.paid_amount = Decimal('500')
+        fee.save()
+        fee.paid_amount = Decimal('800')
+        fee.save()
+        fee.save()
+        self.hostel.refresh_from_db()
+        self.assertEqual(self.hostel.total_funds, Decimal('6200'))
+        self.assertEqual(fee.fund_movements.count(), 3)
+
+    def test_stale_instance_posts_delta_from_stored_amount(self):
+        self.add_students(1)
+        first = StudentFee.objects.get(fee_type__name='mess')
+        second = StudentFee.objects.get(pk=first.pk)
+        first.paid_amount = Decimal('1000')
+        first.save()
+        second.paid_amount = Decimal('900')
+        second.save()
+        self.hostel.refresh_from_db()
+        self.assertEqual(self.hostel.total_funds, Decimal('6300'))
+
+
+class MonthlyFeeGenerationTests(HostelFixtureMixin, TestCase):
+    def test_generation_is_idempotent(self):
+        self.add_students(3)
+        amounts = {'mess': Decimal('3000'), 'seat': Decimal('5000')}
+        self.assertEqual(billing.generate_monthly_fees(self.hostel, '2025-06', amounts), 6)
+        self.assertEqual(billing.generate_monthly_fees(self.hostel, '2025-06', amounts), 0)
+        self.assertEqual(
+            StudentFee.objects.filter(period='2025-06', due_amount=Decimal('3000')).count(), 3
+        )
+
+    def test_query_count_does_not_grow_with_students(self):
+        self.add_students(1)
+        with CaptureQueriesContext(connection) as ctx:
+            billing.generate_monthly_fees(self.hostel, '2025-06', {'mess': 100})
+        self.add_students(20)
+        with self.assertNumQueries(len(ctx.captured_queries)):
+            billing.generate_monthly_fees(self.hostel, '2025-07', {'mess': 100})
+
+    def test_unknown_fee_types_rejected(self):
+        self.add_students(1)
+        with self.assertRaisesMessage(CommandError, "Unknown monthly fee type(s): messs, security."):
+            call_command(
+                'generate_monthly_fees', '--period', '2025-06',
+                '--amount', 'messs=3000', '--amount', 'seat=5000', '--amount', 'security=1', stdout=StringIO(),
+            )
+        self.assertFalse(StudentFee.objects.filter(period='2025-06').exists())
+
+    @override_settings(JOBS_RUN_INLINE=True)
+    def test_command_and_view(self):
+        self.add_students(2)
+        call_command('generate_monthly_fees', '--period', '2025-06', '--amount', 'mess=3000', stdout=StringIO())
+        self.client.login(username='warden', password='pass')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('generate_monthly_fees'), {
+                'period': '2025-06', 'amount_mess': '3000', 'amount_seat': '5000',
+            })
+        job = Job.objects.get()
+        self.assertRedirects(response, job.get_absolute_url())
+        self.assertEqual(StudentFee.objects.filter(period='2025-06').count(), 4)
+        job.refresh_from_db()
+        self.assertEqual(job.result['created'], 2)
+
+
+class StudentImportTests(HostelFixtureMixin, TestCase):
+    header = 'username,password,name,contact_number,email,enrollment_date,cnic,emergency_contact_number\n'
+
+    def upload(self, body):
+        return SimpleUploadedFile('students.csv', (self.header + body).encode(), content_type='text/csv')
+
+    def test_valid_rows_created_and_bad_rows_reported(self):
+        Student.objects.create(name='Existing', hostel=self.hostel, cnic='35202-0000009-1')
+        body = (
+            'ali,pw1,Ali,,ali@example.com,2025-05-01,35202-0000001-1,+923001234567\n'
+            'sara,pw2,Sara,,,2025-05-01,35202-0000002-1,\n'
+            'bad,pw3,Bad,,,2025-05-01,1234,\n'
+            'warden,pw4,Taken,,,2025-05-01,35202-0000004-1,\n'
+            'dupe,pw5,Dupe,,,2025-05-01,35202-0000009-1,\n'
+            'ali,pw6,Again,,,2025-05-01,35202-0000006-1,\n'
+        )
+        result = imports.import_students(self.hostel, imports.read_rows(self.upload(body)), chunk_size=2)
+        self.assertEqual(result['created'], 2)
+        self.assertEqual([row for row, _ in result['errors']], [3, 4, 5, 6])
+        user = User.objects.get(username='ali')
+        self.assertTrue(user.check_password('pw1'))
+        self.assertEqual(user.student.hostel, self.hostel)
+
+    def test_uniqueness_checked_once_per_chunk(self):
+        body = ''.join(
+            f'user{i},pw,Name {i},,,2025-05-01,35202-{i:07d}-1,\n' for i in range(10)
+        )
+        with CaptureQueriesContext(connection) as ctx:
+            imports.import_students(self.hostel, imports.read_rows(self.upload(body)), chunk_size=10)
+        selects = [q for q in ctx.captured_queries if q['sql'].startswith('SELECT')]
+        self.assertEqual(len(selects), 2)
+
+    @override_settings(JOBS_RUN_INLINE=True)
+    def test_view_queues_import_and_job_lists_skipped_rows(self):
+        self.client.login(username='warden', password='pass')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('import_students'), {
+                'file': self.upload('ok,pw,Ok,,,2025-05-01,35202-0000001-1,\nx,pw,X,,,2025-05-01,bad-cnic,\n'),
+            })
+        response = self.client.get(response.url)
+        job = response.context['job']
+        self.assertEqual(job.status, 'succeeded')
+        self.assertIsNone(job.payload)
+        self.assertContains(response, 'Imported 1 student(s); 1 row(s) were skipped')
+        self.assertContains(response, 'CNIC must be in XXXXX-XXXXXXX-X format.')
+
+    def test_upload_stored_on_job_not_on_disk(self):
+        self.client.login(username='warden', password='pass')
+        upload = self.upload('ok,pw,Ok,,,2025-05-01,35202-0000001-1,\n')
+        with override_settings(MEDIA_ROOT='/nonexistent'):
+            self.client.post(reverse('import_students'), {'file': upload})
+        job = Job.objects.get()
+        self.assertEqual(bytes(job.payload), (self.header + 'ok,pw,Ok,,,2025-05-01,35202-0000001-1,\n').encode())
+        self.assertEqual(job.kwargs, {'hostel_id': self.hostel.id, 'filename': 'students.csv'})
+        jobs.run_job(job.pk)
+        self.assertTrue(User.objects.filter(username='ok').exists())
+
+    @override_settings(STUDENT_IMPORT_MAX_SIZE=10)
+    def test_oversized_import_rejected(self):
+        self.client.login(username='warden', password='pass')
+        response = self.client.post(reverse('import_students'), {'file': self.upload('')})
+        self.assertFormError(response.context['form'], 'file', 'File is larger than 10\xa0bytes.')
+        self.assertFalse(Job.objects.exists())
+
+
+class ExportTests(HostelFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.login(username='owner', password='pass')
+
+    def export(self, kind, **params):
+        response = self.client.get(reverse('export_data', args=[kind]), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode().splitlines()
+
+    def test_exports_only_owned_hostels(self):
+        stranger = User.objects.create_user(username='stranger', password='pass', role='Owner')
+        elsewhere = Hostel.objects.create(name='Elsewhere', address='3 Road', owner=stranger)
+        self.add_students(2)
+        self.add_students(1, hostel=elsewhere)
+        lines = self.export('students')
+        self.assertEqual(lines[0].split(',')[:2], ['Hostel', 'Name'])
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(len(self.export('fees')), 7)
+
+    def test_expense_date_range(self):
+        Expense.objects.create(hostel=self.hostel, description='Old', amount=10, date='2024-01-05')
+        Expense.objects.create(hostel=self.hostel, description='New', amount=20, date='2025-03-05')
+        lines = self.export('expenses', start='2025-01-01', end='2025-12-31')
+        self.assertEqual(len(lines), 2)
+        self.assertIn('New', lines[1])
+
+    def test_unknown_export(self):
+        response = self.client.get(reverse('export_data', args=['rooms']))
+        self.assertEqual(response.status_code, 404)
+
+
+class StudentListingTests(HostelFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.login(username='warden', password='pass')
+        self.url = reverse('warden_dashboard')
+
+    def test_keyset_pages_cover_every_row_once(self):
+        self.add_students(7)
+        queryset = Student.objects.all()
+        seen, cursor = [], None
+        while True:
+            page = keyset_page(queryset, ('name', 'id'), after=cursor, size=3)
+            seen.extend(s.id for s in page['items'])
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        expected = list(queryset.order_by('name', 'id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+        back = keyset_page(queryset, ('name', 'id'), before=page['prev_cursor'], size=3)
+        self.assertEqual([s.id for s in back['items']], expected[3:6])
+
+    def test_malformed_cursors_fall_back_to_first_page(self):
+        self.add_students(3)
+        for values in (['Student 1'], ['Student 1', {'id': 1}], ['Student 1', 'x'], [None, 1], ['a', 1, 2]):
+            response = self.client.get(self.url, {'after': encode_cursor(values)})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['students'][0].name, 'Student 0')
+
+    def test_dashboard_paginates_and_limits_fee_matrix(self):
+        self.add_students(5)
+        with mock.patch('core.views.STUDENTS_PER_PAGE', 2):
+            first = self.client.get(self.url)
+            self.assertEqual(len(first.context['students']), 2)
+            self.assertEqual(set(first.context['fees_summary']), {s.id for s in first.context['students']})
+            second = self.client.get(self.url, {'after': first.context['next_cursor']})
+        self.assertEqual(second.context['students'][0].name, 'Student 2')
+        self.assertEqual(second.context['student_count'], 5)
+
+    def test_search_by_cnic_and_room(self):
+        students = self.add_students(3)
+        response = self.client.get(self.url, {'q': '0000001'})
+        self.assertEqual([s.id for s in response.context['students']], [students[1].id])
+        response = self.client.get(self.url, {'q': students[2].room.room_number})
+        self.assertEqual([s.id for s in response.context['students']], [students[2].id])
+
+
+class HotPathIndexTests(HostelFixtureMixin, TestCase):
+    def assertUsesIndex(self, queryset, index_name):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # Tiny test tables make a sequential scan cheapest; rule it out
+                # so the plan shows which index the query can use.
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+        if connection.vendor == 'sqlite' and index_name.startswith('unique_'):
+            # SQLite builds unique constraints into the table definition and
+            # names their index after the table instead.
+            index_name = f'sqlite_autoindex_{queryset.model._meta.db_table}'
+        self.assertIn(index_name, plan)
+
+    def test_dashboard_lookups_use_indexes(self):
+        student = self.add_students(1)[0]
+        room = student.room
+        self.assertUsesIndex(
+            MessPlan.objects.filter(hostel=self.hostel, month='2025-05'),
+            'unique_mess_plan_per_month',
+        )
+        self.assertUsesIndex(
+            StudentFee.objects.filter(student=student, fee_type=self.fee_types['mess'], period='2025-05'),
+            'unique_fee_per_period',
+        )
+        self.assertUsesIndex(
+            Expense.objects.filter(hostel=self.hostel).order_by('-date')[:5],
+            'expense_hostel_date_idx',
+        )
+        self.assertUsesIndex(
+            Bed.objects.filter(room=room, student__isnull=True),
+            'bed_room_student_idx',
+        )
+        self.assertUsesIndex(
+            Student.objects.filter(hostel=self.hostel).order_by('name', 'id')[:50],
+            'student_hostel_name_idx',
+        )
+
+    def test_duplicate_period_fee_rejected(self):
+        student = self.add_students(1)[0]
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            StudentFee.objects.create(
+                student=student, fee_type=self.fee_types['mess'], period='2025-05', due_amount=1,
+            )
+
+    def test_manage_fees_updates_existing_period(self):
+        student = self.add_students(1)[0]
+        self.client.login(username='warden', password='pass')
+        self.client.post(reverse('manage_fees', args=[student.id]), {
+            'fee_type': self.fee_types['mess'].id, 'due_amount': '1000',
+            'paid_amount': '1000', 'period': '2025-05',
+        })
+        fee = student.fees.get(fee_type=self.fee_types['mess'])
+        self.assertEqual(fee.paid_amount, Decimal('1000'))
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class DashboardCacheTests(HostelFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.login(username='warden', password='pass')
+        self.url = reverse('warden_dashboard')
+
+    def test_second_request_is_served_from_cache(self):
+        self.add_students(2)
+        cold = self.count_queries(self.url)
+        warm = self.count_queries(self.url)
+        self.assertLess(warm, cold)
+        self.assertEqual(caching.stats(), {'hits': 3, 'misses': 3})
+
+    def test_fee_change_invalidates_totals(self):
+        student = self.add_students(1)[0]
+        self.assertEqual(self.client.get(self.url).context['total_fees'], Decimal('5800'))
+        fee = student.fees.get(fee_type__name='mess')
+        version = caching.hostel_versions([self.hostel.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            fee.paid_amount = Decimal('1000')
+            fee.save()
+            # Readers keep the old token until the write commits.
+            self.assertEqual(caching.hostel_versions([self.hostel.pk]), version)
+        self.assertNotEqual(caching.hostel_versions([self.hostel.pk]), version)
+        self.assertEqual(self.client.get(self.url).context['total_fees'], Decimal('6400'))
+
+    def test_raw_fee_save_skips_invalidation(self):
+        fee = StudentFee.objects.get(student=self.add_students(1)[0], fee_type__name='mess')
+        version = caching.hostel_versions([self.hostel.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            for obj in serializers.deserialize('json', serializers.serialize('json', [fee])):
+                obj.save()
+        self.assertEqual(caching.hostel_versions([self.hostel.pk]), version)
+
+    def test_signals_read_only_the_hostel_id(self):
+        student = self.add_students(1)[0]
+        fee = StudentFee.objects.get(student=student, fee_type__name='mess')
+        bed = Bed.objects.get(student=student)
+        with CaptureQueriesContext(connection) as ctx:
+            fee.delete()
+            bed.delete()
+        selects = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('SELECT')]
+        self.assertEqual(len(selects), 2)
+        self.assertTrue(all('"name"' not in sql and '"room_number"' not in sql for sql in selects))
+
+    def test_bulk_generation_invalidates_fee_matrix(self):
+        student = self.add_students(1)[0]
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            billing.generate_monthly_fees(self.hostel, '2025-06', {'mess': 3000})
+        matrix = self.client.get(self.url).context['fees_summary']
+        self.assertEqual(matrix[student.id]['mess'].period, '2025-06')
+
+    def test_stats_endpoint_requires_admin(self):
+        self.assertEqual(self.client.get(reverse('cache_stats')).status_code, 403)
+        User.objects.create_user(username='admin', password='pass', role='Admin')
+        self.client.login(username='admin', password='pass')
+        self.assertEqual(self.client.get(reverse('cache_stats')).json(), {'hits': 0, 'misses': 0})
+
+
+class BedAllocationTests(HostelFixtureMixin, TestCase):
+    def test_reallocation_frees_previous_bed(self):
+        student = self.add_students(1)[0]
+        old_bed = student.bed
+        room = self.add_room(beds=2)
+        bed = allocate_bed(student, room)
+        old_bed.refresh_from_db()
+        self.assertIsNone(old_bed.student)
+        self.assertEqual(Student.objects.get(pk=student.pk).room, room)
+        self.assertEqual(bed.room, room)
+
+    def test_full_room_keeps_current_bed(self):
+        first, second = self.add_students(2)
+        with self.assertRaises(AllocationError):
+            allocate_bed(second, first.room)
+        self.assertEqual(Student.objects.get(pk=second.pk).bed, second.bed)
+
+    def test_view_reports_allocation(self):
+        student = self.add_students(1)[0]
+        room = self.add_room(beds=2)
+        self.client.login(username='warden', password='pass')
+        response = self.client.post(reverse('allocate_room', args=[student.id]), {'room': room.id})
+        self.assertRedirects(response, reverse('warden_dashboard'))
+        self.assertEqual(Student.objects.get(pk=student.pk).room, room)
+
+
+@skipIf(
+    connection.vendor == 'sqlite' and not connection.settings_dict.get('TEST', {}).get('NAME'),
+    "needs a file-backed SQLite (TEST_DATABASE_NAME) or PostgreSQL test database",
+)
+class BedAllocationStressTests(HostelFixtureMixin, TransactionTestCase):
+    def test_concurrent_allocation_never_double_books(self):
+        students = list(Student.objects.bulk_create(
+            Student(name=f'Rush {i}', hostel=self.hostel, cnic=f'42101-{i:07d}-1') for i in range(24)
+        ))
+        room = self.add_room(beds=3)
+        other = self.add_room(beds=3)
+        allocated, failed = [], []
+        barrier = threading.Barrier(len(students))
+
+        def worker(student, target):
+            barrier.wait()
+            try:
+                allocate_bed(student, target)
+                allocated.append(student.id)
+            except AllocationError:
+                failed.append(student.id)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=worker, args=(student, room if i % 2 else other))
+            for i, student in enumerate(students)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        occupied = list(Bed.objects.exclude(student=None).values_list('student_id', flat=True))
+        self.assertEqual(len(allocated), 6)
+        self.assertEqual(len(failed), 18)
+        self.assertEqual(sorted(occupied), sorted(allocated))
+
+
+class BatchAllocationTests(HostelFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.students = list(Student.objects.bulk_create(
+            Student(name=f'Intake {i}', hostel=self.hostel, cnic=f'61101-{i:07d}-1') for i in range(5)
+        ))
+
+    def test_groups_share_a_room_and_preferences_apply(self):
+        single = self.add_room(beds=1)
+        self.add_room(beds=2)
+        triple = self.add_room(beds=3)
+        preferences = [
+            {'cnic': self.students[0].cnic, 'group': 'A'},
+            {'cnic': self.students[1].cnic, 'group': 'A'},
+            {'cnic': self.students[2].cnic, 'group': 'A'},
+            {'cnic': self.students[3].cnic, 'bed_type': '1-bed'},
+        ]
+        plan = plan_allocation(self.hostel, unassigned_requests(self.hostel, preferences))
+        rooms = {student.id: bed.room_id for student, bed in plan['assignments']}
+        self.assertEqual({rooms[s.id] for s in self.students[:3]}, {triple.id})
+        self.assertEqual(rooms[self.students[3].id], single.id)
+        self.assertEqual(len(plan['assignments']), 5)
+        self.assertEqual(plan['unplaced'], [])
+
+    def test_dry_run_changes_nothing_and_apply_uses_one_transaction(self):
+        self.add_room(beds=3)
+        self.add_room(beds=3)
+        call_command('allocate_beds', '--hostel', self.hostel.id, '--dry-run', stdout=StringIO())
+        plan = plan_allocation(self.hostel, unassigned_requests(self.hostel))
+        self.assertFalse(Bed.objects.exclude(student=None).exists())
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(apply_allocation(plan), 5)
+        bed_updates = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "core_bed"')]
+        self.assertEqual(len(bed_updates), 1)
+        self.assertEqual(Bed.objects.exclude(student=None).count(), 5)
+
+    def test_unplaced_students_and_stale_plan(self):
+        room = self.add_room(beds=3)
+        plan = plan_allocation(self.hostel, unassigned_requests(self.hostel, room_prefix='9'))
+        self.assertEqual(len(plan['unplaced']), 5)
+        plan = plan_allocation(self.hostel, unassigned_requests(self.hostel))
+        self.assertEqual(len(plan['unplaced']), 2)
+        allocate_bed(self.students[4], room)
+        with self.assertRaises(AllocationError):
+            apply_allocation(plan)
+
+    def test_view_previews_then_applies(self):
+        self.add_room(beds=3)
+        self.client.login(username='warden', password='pass')
+        url = reverse('batch_allocate')
+        response = self.client.post(url, {'preview': '1'})
+        self.assertEqual(len(response.context['plan']['assignments']), 3)
+        self.assertFalse(Bed.objects.exclude(student=None).exists())
+        response = self.client.post(url, {'apply': '1', 'plan': response.context['signed_plan']})
+        self.assertRedirects(response, reverse('warden_dashboard'))
+        self.assertEqual(Bed.objects.exclude(student=None).count(), 3)
+
+    def test_view_applies_the_previewed_plan_only(self):
+        self.add_room(beds=3)
+        self.client.login(username='warden', password='pass')
+        url = reverse('batch_allocate')
+        preferences = SimpleUploadedFile('prefs.csv', f'cnic,group\n{self.students[4].cnic},\n'.encode())
+        response = self.client.post(url, {'preview': '1', 'bed_type': '3-bed', 'preferences': preferences})
+        planned = [(student.id, bed.id) for student, bed in response.context['plan']['assignments']]
+        signed_plan = response.context['signed_plan']
+
+        self.assertRedirects(self.client.post(url, {'apply': '1'}), url)
+        self.assertRedirects(self.client.post(url, {'apply': '1', 'plan': signed_plan + 'x'}), url)
+        self.assertFalse(Bed.objects.exclude(student=None).exists())
+
+        self.client.post(url, {'apply': '1', 'plan': signed_plan})
+        self.assertEqual(list(Bed.objects.exclude(student=None).values_list('student_id', 'id')), planned)
+
+
+class OccupancyCounterTests(HostelFixtureMixin, TestCase):
+    def assertCounters(self, room, room_occupied, hostel_total, hostel_occupied):
+        room.refresh_from_db()
+        self.hostel.refresh_from_db()
+        self.assertEqual(room.occupied_beds, room_occupied)
+        self.assertEqual(
+            (self.hostel.total_beds, self.hostel.occupied_beds), (hostel_total, hostel_occupied)
+        )
+
+    def test_counters_follow_every_allocation_path(self):
+        first = self.add_students(1)[0]
+        old_room = first.room
+        self.assertCounters(old_room, 1, 1, 1)
+        room = self.add_room(beds=3)
+        allocate_bed(first, room)
+        self.assertCounters(old_room, 0, 4, 1)
+        self.assertCounters(room, 1, 4, 1)
+        self.assertEqual(room.available_beds(), 2)
+        others = list(Student.objects.bulk_create(
+            Student(name=f'Late {i}', hostel=self.hostel, cnic=f'71101-{i:07d}-1') for i in range(2)
+        ))
+        apply_allocation(plan_allocation(self.hostel, unassigned_requests(self.hostel, room_prefix=room.room_number)))
+        self.assertCounters(room, 3, 4, 3)
+        others[0].delete()
+        self.assertCounters(room, 2, 4, 2)
+        bed = Bed.objects.get(student=first)
+        bed.student = None
+        bed.save()
+        self.assertCounters(room, 1, 4, 1)
+        room.delete()
+        self.hostel.refresh_from_db()
+        self.assertEqual((self.hostel.total_beds, self.hostel.occupied_beds), (1, 0))
+
+    def test_reconcile_occupancy_repairs_drift(self):
+        student = self.add_students(1)[0]
+        Room.objects.update(occupied_beds=5)
+        Hostel.objects.update(total_beds=0)
+        call_command('reconcile_occupancy', stdout=StringIO())
+        self.assertCounters(student.room, 1, 1, 1)
+
+    def test_allocation_form_reads_counter(self):
+        student = self.add_students(1)[0]
+        spare = self.add_room(beds=2)
+        with self.assertNumQueries(2):
+            rooms = list(RoomAllocationForm(hostel=self.hostel).fields['room'].queryset)
+        self.assertEqual(rooms, [spare])
+        self.assertNotIn(student.room, rooms)
+
+
+class RoomBuilderTests(HostelFixtureMixin, TestCase):
+    def test_range_created_in_constant_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            created = create_room_range(self.hostel, room_numbers(101, 102), '3-bed')
+        with self.assertNumQueries(len(ctx.captured_queries)):
+            create_room_range(self.hostel, room_numbers(201, 240), '3-bed')
+        self.assertEqual(len(created), 2)
+        self.assertEqual(Bed.objects.filter(room__hostel=self.hostel).count(), 126)
+        self.hostel.refresh_from_db()
+        self.assertEqual(self.hostel.total_beds, 126)
+
+    def test_existing_numbers_abort_whole_range(self):
+        create_room_range(self.hostel, ['105'], '1-bed')
+        with self.assertRaisesMessage(RoomBuildError, '105'):
+            create_room_range(self.hostel, room_numbers(101, 110), '2-bed')
+        self.assertEqual(Room.objects.count(), 1)
+
+    def test_concurrent_overlap_reported(self):
+        create_room_range(self.hostel, room_numbers(101, 102), '2-bed')
+        # As if the other request's rooms appeared after the check.
+        with mock.patch('core.rooms._taken', side_effect=[[], ['101', '102']]):
+            with self.assertRaisesMessage(RoomBuildError, 'Rooms already exist: 101, 102'):
+                create_room_range(self.hostel, room_numbers(101, 103), '2-bed')
+        self.assertEqual(Room.objects.count(), 2)
+        self.assertEqual(create_beds([]), [])
+
+    def test_views_create_rooms_and_beds(self):
+        self.client.login(username='warden', password='pass')
+        response = self.client.post(reverse('build_rooms'), {
+            'prefix': 'A-', 'start': '1', 'end': '4', 'bed_type': '2-bed',
+        })
+        self.assertRedirects(response, reverse('warden_dashboard'))
+        self.client.post(reverse('create_room'), {
+            'room_number': 'B-1', 'bed_type': '3-bed', 'number_of_beds': '3',
+        })
+        self.assertEqual(
+            sorted(Room.objects.values_list('room_number', flat=True)),
+            ['A-1', 'A-2', 'A-3', 'A-4', 'B-1'],
+        )
+        self.hostel.refresh_from_db()
+        self.assertEqual(self.hostel.total_beds, 11)
+        response = self.client.post(reverse('build_rooms'), {'start': '9', 'end': '1', 'bed_type': '1-bed'})
+        self.assertContains(response, 'End room number must not be below the start.')
+
+
+class ViewBenchmarkTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        media_override = override_settings(MEDIA_ROOT=self.media)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+    def test_seeded_totals_match_rows(self):
+        seed_hostels(hostels=2, students=9, periods=2)
+        for hostel in Hostel.objects.all():
+            fees = StudentFee.objects.filter(student__hostel=hostel).aggregate(t=Sum('paid_amount'))['t']
+            expenses = Expense.objects.filter(hostel=hostel).aggregate(t=Sum('amount'))['t']
+            self.assertEqual(hostel.total_funds, fees - expenses)
+            self.assertEqual(hostel.occupied_beds, hostel.students.count())
+            self.assertEqual(hostel.total_beds, Bed.objects.filter(room__hostel=hostel).count())
+
+    def test_same_seed_same_data(self):
+        def snapshot():
+            return (
+                list(Student.objects.order_by('cnic').values_list('name', 'cnic', 'contact_number')),
+                list(StudentFee.objects.order_by('student__cnic', 'fee_type__name', 'period')
+                     .values_list('period', 'due_amount', 'paid_amount')),
+                list(Room.objects.order_by('room_number').values_list('room_number', 'bed_type')),
+                list(Hostel.objects.order_by('name').values_list('name', 'total_funds')),
+            )
+
+        seed_hostels(hostels=2, students=7, seed=3)
+        first = snapshot()
+        User.objects.all().delete()
+        seed_hostels(hostels=2, students=7, seed=3)
+        self.assertEqual(snapshot(), first)
+        User.objects.all().delete()
+        seed_hostels(hostels=2, students=7, seed=4)
+        self.assertNotEqual(snapshot(), first)
+
+    def test_seed_command_refuses_to_run_twice(self):
+        with self.settings(DEBUG=True):
+            call_command('seed_hms', '--students', '5', '--periods', '2', stdout=StringIO())
+            self.assertEqual(Student.objects.count(), 5)
+            self.assertEqual(StudentFee.objects.count(), 5 * 5)
+            with self.assertRaisesMessage(CommandError, 'already present'):
+                call_command('seed_hms', stdout=StringIO())
+
+    def test_seed_command_guards_real_databases(self):
+        with self.assertRaisesMessage(CommandError, '--force'):
+            call_command('seed_hms', '--students', '1', stdout=StringIO())
+        self.assertFalse(User.objects.exists())
+
+        out = StringIO()
+        call_command('seed_hms', '--students', '1', '--periods', '1', '--force', stdout=out)
+        password = out.getvalue().split('with password ')[1].rstrip().rstrip('.')
+        admin = User.objects.get(username='seed-admin')
+        self.assertFalse(admin.check_password('seed-pass'))
+        self.assertTrue(admin.check_password(password))
+
+    def test_views_within_shipped_budgets(self):
+        users = seed_hostels(hostels=2, students=12)
+        results = run_benchmarks(users)
+        self.assertEqual({r['role'] for r in results}, {'Student', 'Warden', 'Owner', 'Admin'})
+        self.assertEqual(
+            {r['status'] for r in results if r['role'] == 'Warden' and r['url'].startswith('warden')}, {200}
+        )
+        self.assertEqual(
+            {r['status'] for r in results if r['url'] in ('download_mess_plan', 'mess_plan_thumbnail')}, {200}
+        )
+        budgets = json.loads((Path(__file__).parent / 'benchmark_budgets.json').read_text())
+        self.assertEqual(check_budgets(results, budgets), [])
+
+    def test_budget_violations_reported(self):
+        results = [
+            {'role': 'Warden', 'url': 'warden_dashboard', 'status': 200, 'queries': 30, 'ms': 5},
+            {'role': 'Student', 'url': 'warden_dashboard', 'status': 403, 'queries': 90, 'ms': 5},
+        ]
+        self.assertEqual(
+            check_budgets(results, {'warden_dashboard': {'queries': 20, 'ms': 50}}),
+            ['Warden warden_dashboard: queries 30 > budget 20'],
+        )
+
+
+class RequestProfilingTests(HostelFixtureMixin, TestCase):
+    @override_settings(REQUEST_PROFILING=True)
+    def test_timings_in_header_and_log(self):
+        self.add_students(3)
+        self.client.login(username='warden', password='pass')
+        with self.assertLogs('hms.requests', 'INFO') as logs:
+            queries = self.count_queries(reverse('warden_dashboard'))
+            cache.clear()
+            response = self.client.get(reverse('warden_dashboard'))
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries, \d+ duplicate", tpl;dur=')
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['view'], 'warden_dashboard')
+        self.assertEqual(record['queries'], queries)
+        self.assertEqual(record['bytes'], len(response.content))
+        self.assertGreater(record['template_ms'], 0)
+
+    @override_settings(REQUEST_PROFILING=True)
+    def test_streamed_body_counted_in_log(self):
+        self.add_students(3)
+        self.client.login(username='owner', password='pass')
+        with self.assertLogs('hms.requests', 'INFO') as logs:
+            response = self.client.get(reverse('export_data', args=['fees']))
+            self.assertEqual(logs.records, [])
+            content = b''.join(response.streaming_content)
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['view'], 'export_data')
+        self.assertGreater(record['queries'], 0)
+        self.assertEqual(record['bytes'], len(content))
+
+    def test_disabled_by_default(self):
+        self.client.login(username='warden', password='pass')
+        self.assertNotIn('Server-Timing', self.client.get(reverse('warden_dashboard')))
+
+    def test_repeated_sql_shape_counted_as_duplicate(self):
+        students = self.add_students(3)
+        profile = RequestProfile()
+        with connection.execute_wrapper(profile):
+            for student in students:
+                Student.objects.filter(pk=student.pk).first()
+            Hostel.objects.count()
+        self.assertEqual((profile.queries, profile.duplicates), (4, 2))
+        self.assertEqual(profile.top_duplicate()['count'], 3)
+        self.assertIn('"core_student"', profile.top_duplicate()['sql'])
+
+
+class UserLoadingTests(HostelFixtureMixin, TestCase):
+    def dashboard_queries(self, username, url, backend):
+        with self.settings(AUTHENTICATION_BACKENDS=[backend]):
+            self.client.login(username=username, password='pass')
+            cache.clear()
+            queries = self.count_queries(reverse(url))
+            self.client.logout()
+        return queries
+
+    def test_related_rows_loaded_with_user(self):
+        student = self.add_students(1)[0]
+        User.objects.create_user(username='kid', password='pass', role='Student', student=student)
+        for username, url, saved in (('kid', 'student_dashboard', 4), ('warden', 'warden_dashboard', 1)):
+            plain = self.dashboard_queries(username, url, 'django.contrib.auth.backends.ModelBackend')
+            joined = self.dashboard_queries(username, url, 'core.backends.HostelUserBackend')
+            self.assertEqual(plain - joined, saved, url)
+
+    def test_failed_login_hashes_once(self):
+        with mock.patch.object(User, 'check_password', autospec=True, side_effect=User.check_password) as check, \
+                mock.patch.object(User, 'set_password', autospec=True, side_effect=User.set_password) as dummy:
+            self.assertFalse(self.client.login(username='warden', password='wrong'))
+            self.assertFalse(self.client.login(username='nobody', password='wrong'))
+        self.assertEqual((check.call_count, dummy.call_count), (1, 1))
+        self.assertTrue(self.client.login(username='warden', password='pass'))
+
+    def test_student_dashboard_shows_room(self):
+        student = self.add_students(1)[0]
+        User.objects.create_user(username='kid', password='pass', role='Student', student=student)
+        self.client.login(username='kid', password='pass')
+        response = self.client.get(reverse('student_dashboard'))
+        self.assertContains(response, f'<strong>Room:</strong> {student.room.room_number}')
+        self.assertContains(response, '<strong>Hostel:</strong> North')
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class SessionBackendTests(HostelFixtureMixin, TestCase):
+    def session_queries(self, backend):
+        with self.settings(SESSION_ENGINE=f'django.contrib.sessions.backends.{backend}'):
+            # A new client, because SessionMiddleware picks its engine when
+            # the handler first loads middleware.
+            client = Client()
+            client.login(username='warden', password='pass')
+            with CaptureQueriesContext(connection) as ctx:
+                response = client.get(reverse('manage_categories'))
+        self.assertEqual(response.status_code, 200)
+        return [q['sql'] for q in ctx.captured_queries if 'django_session' in q['sql']]
+
+    def test_session_table_skipped_per_request(self):
+        self.assertEqual(len(self.session_queries('db')), 1)
+        self.assertEqual(self.session_queries('cached_db'), [])
+        self.assertEqual(self.session_queries('signed_cookies'), [])
+
+
+class StudentStatementTests(HostelFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.student = self.add_students(1)[0]
+        # 2025-05 comes from add_students; add 2024-02 .. 2025-04 as well.
+        for month in range(2, 16):
+            period = f'{2024 + (month - 1) // 12}-{(month - 1) % 12 + 1:02d}'
+            for name, paid in (('seat', '1000'), ('mess', '250')):
+                StudentFee.objects.create(
+                    student=self.student, fee_type=self.fee_types[name], period=period,
+                    due_amount=Decimal('1000'), paid_amount=Decimal(paid),
+                )
+
+    def test_fee_status_single_query(self):
+        with self.assertNumQueries(1):
+            status = self.student.fee_status()
+        self.assertEqual(set(status), {'security', 'seat', 'mess'})
+        first = StudentFee.objects.filter(student=self.student, fee_type__name='seat').order_by('id').first()
+        self.assertEqual(status['seat'], first)
+
+    def test_statement_pages_newest_period_first(self):
+        with self.assertNumQueries(4):
+            first = reports.fee_statement(self.student, size=12)
+        self.assertEqual([fee.fee_type.name for fee in first['one_time']], ['security'])
+        self.assertEqual(first['items'][0]['period'], '2025-05')
+        self.assertEqual(first['items'][0]['outstanding'], Decimal('1200'))
+        self.assertEqual(first['items'][1]['outstanding'], Decimal('750'))
+        self.assertEqual([fee.fee_type.name for fee in first['items'][1]['fees']], ['mess', 'seat'])
+        self.assertIsNone(first['prev_cursor'])
+
+        second = reports.fee_statement(self.student, after=first['next_cursor'], size=12)
+        self.assertEqual([row['period'] for row in second['items']], ['2024-04', '2024-03', '2024-02'])
+        self.assertIsNone(second['next_cursor'])
+        back = reports.fee_statement(self.student, before=second['prev_cursor'], size=12)
+        self.assertEqual(back['items'], first['items'])
+
+        self.assertEqual(first['totals']['due'], Decimal('5000') + 15 * Decimal('2000'))
+        self.assertEqual(first['totals']['outstanding'], Decimal('1200') + 14 * Decimal('750'))
+
+    def test_views(self):
+        User.objects.create_user(username='kid', password='pass', role='Student', student=self.student)
+        self.client.login(username='kid', password='pass')
+        response = self.client.get(reverse('student_dashboard'))
+        fees = response.context['fees']
+        self.assertEqual(len(fees), 11)
+        self.assertEqual((fees[0].fee_type.name, fees[0].period), ('security', None))
+        self.assertEqual([fee.period for fee in fees[1:3]], ['2025-05', '2025-05'])
+        self.assertContains(response, '<strong>Outstanding:</strong> 11700')
+        response = self.client.get(reverse('student_statement'))
+        self.assertContains(response, 'One-time Fees')
+        self.assertContains(response, '<td>security</td>')
+        self.assertContains(response, '<td>2025-05</td>')
+        self.assertNotContains(response, '<td>2024-03</td>')
+
+
+class MessPlanDownloadTests(HostelFixtureMixin, TestCase):
+    CONTENT = b'%PDF-1.4 mess plan for the month'
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        media_override = override_settings(MEDIA_ROOT=media)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.plan = MessPlan.objects.create(
+            hostel=self.hostel, month='2025-05', pdf_file=SimpleUploadedFile('plan.pdf', self.CONTENT),
+        )
+        student = self.add_students(1)[0]
+        User.objects.create_user(username='kid', password='pass', role='Student', student=student)
+        self.client.login(username='kid', password='pass')
+        self.url = self.plan.get_download_url()
+
+    def test_full_download_is_cacheable(self):
+        response = self.client.get(self.url)
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertTrue(response['Last-Modified'])
+
+        repeat = self.client.get(self.url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(repeat.status_code, 304)
+        self.assertEqual(repeat.content, b'')
+        self.assertEqual(repeat['ETag'], response['ETag'])
+        self.assertEqual(repeat['Last-Modified'], response['Last-Modified'])
+        unversioned = self.client.get(reverse('download_mess_plan', args=[self.plan.pk]))
+        self.assertEqual(unversioned['Cache-Control'], 'private, no-cache')
+
+    def test_range_requests(self):
+        response = self.client.get(self.url, headers={'Range': 'bytes=1-4'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'PDF-')
+        self.assertEqual(response['Content-Range'], f'bytes 1-4/{len(self.CONTENT)}')
+
+        stale = self.client.get(self.url, headers={'Range': 'bytes=1-4', 'If-Range': '"old"'})
+        self.assertEqual(stale.status_code, 200)
+        outside = self.client.get(self.url, headers={'Range': 'bytes=500-'})
+        self.assertEqual(outside.status_code, 416)
+
+        self.assertEqual(parse_range('bytes=-5', 10), (5, 9))
+        self.assertEqual(parse_range('bytes=3-99', 10), (3, 9))
+        self.assertIsNone(parse_range('bytes=0-1,4-5', 10))
+
+    def test_other_hostels_and_anonymous_refused(self):
+        other = Hostel.objects.create(name='South', address='2 Road', owner=self.owner)
+        elsewhere = self.add_students(1, hostel=other)[0]
+        User.objects.create_user(username='outsider', password='pass', role='Student', student=elsewhere)
+        self.client.login(username='outsider', password='pass')
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.login(username='warden', password='pass')
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    @override_settings(MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/')
+    def test_accel_redirect_hands_file_to_nginx(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.plan.pdf_file.name}')
+        self.assertEqual(response.content, b'')
+        self.assertTrue(response['ETag'])
+
+
+class MessPlanStorageTests(HostelFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        media_override = override_settings(MEDIA_ROOT=self.media)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.other = Hostel.objects.create(name='South', address='2 Road', owner=self.owner)
+
+    def stored_files(self):
+        return sorted(os.listdir(os.path.join(self.media, 'mess_plans')))
+
+    def upload(self, hostel, month, content, filename='cmp.pdf'):
+        return MessPlan.objects.create(hostel=hostel, month=month, pdf_file=SimpleUploadedFile(filename, content))
+
+    def test_identical_uploads_share_one_blob(self):
+        first = self.upload(self.hostel, '2025-05', b'%PDF same menu')
+        second = self.upload(self.other, '2025-06', b'%PDF same menu', filename='menu.PDF')
+        third = self.upload(self.other, '2025-07', b'%PDF new menu')
+        self.assertEqual(first.pdf_file.name, second.pdf_file.name)
+        self.assertEqual(first.pdf_file.name, f'mess_plans/{hashlib.sha256(b"%PDF same menu").hexdigest()}.pdf')
+        self.assertNotEqual(third.pdf_file.name, first.pdf_file.name)
+        self.assertEqual(len(self.stored_files()), 2)
+        with second.pdf_file.open('rb') as f:
+            self.assertEqual(f.read(), b'%PDF same menu')
+
+    def test_gc_removes_only_old_orphans(self):
+        kept = self.upload(self.hostel, '2025-05', b'%PDF kept')
+        self.upload(self.other, '2025-05', b'%PDF dropped').delete()
+        call_command('gc_mess_plans', stdout=StringIO())
+        self.assertEqual(len(self.stored_files()), 2)
+
+        out = StringIO()
+        call_command('gc_mess_plans', '--min-age', '0', '--dry-run', stdout=out)
+        self.assertIn('1 orphaned file(s) would be removed', out.getvalue())
+        call_command('gc_mess_plans', '--min-age', '0', stdout=StringIO())
+        self.assertEqual(self.stored_files(), [os.path.basename(kept.pdf_file.name)])
+
+    def test_rehash_folds_legacy_copies_into_blobs(self):
+        legacy = FileSystemStorage(location=self.media)
+        plans = []
+        for hostel, name in ((self.hostel, 'cmp.pdf'), (self.other, 'cmp_7mCPEHt.pdf')):
+            stored = legacy.save(f'mess_plans/{name}', ContentFile(b'%PDF old menu'))
+            plans.append(MessPlan.objects.create(hostel=hostel, month='2025-04', pdf_file=stored))
+        call_command('gc_mess_plans', '--rehash', '--min-age', '0', stdout=StringIO())
+        names = {plan.pdf_file.name for plan in MessPlan.objects.all()}
+        self.assertEqual(names, {f'mess_plans/{hashlib.sha256(b"%PDF old menu").hexdigest()}.pdf'})
+        self.assertEqual(len(self.stored_files()), 1)
+
+
+class MessPlanUploadTests(HostelFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        media_override = override_settings(MEDIA_ROOT=self.media)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.client.login(username='warden', password='pass')
+
+    def post(self, content, name='menu.pdf', client=None):
+        return (client or self.client).post(reverse('upload_mess_plan'), {
+            'month': '2025-05', 'pdf_file': SimpleUploadedFile(name, content),
+        })
+
+    def stored_files(self):
+        directory = os.path.join(self.media, 'mess_plans')
+        return sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+
+    def test_pdf_streamed_into_blob_storage(self):
+        content = b'%PDF-1.7 ' + b'x' * 200_000
+        self.assertRedirects(self.post(content), reverse('warden_dashboard'))
+        plan = MessPlan.objects.get(hostel=self.hostel, month='2025-05')
+        self.assertEqual(plan.pdf_file.name, f'mess_plans/{hashlib.sha256(content).hexdigest()}.pdf')
+        with plan.pdf_file.open('rb') as f:
+            self.assertEqual(f.read(), content)
+        self.assertEqual(self.stored_files(), [os.path.basename(plan.pdf_file.name)])
+
+        self.post(b'%PDF-1.7 corrected', name='MENU.PDF')
+        plan.refresh_from_db()
+        self.assertEqual(plan.pdf_file.name, f'mess_plans/{hashlib.sha256(b"%PDF-1.7 corrected").hexdigest()}.pdf')
+
+    def test_non_pdf_rejected_from_first_chunk(self):
+        response = self.post(b'MZ\x90\x00 not a pdf at all')
+        self.assertFormError(response.context['form'], 'pdf_file', 'File is not a PDF.')
+        self.assertFalse(MessPlan.objects.exists())
+        self.assertEqual(self.stored_files(), [])
+
+    @override_settings(MESS_PLAN_MAX_UPLOAD_SIZE=100)
+    def test_oversized_upload_stopped(self):
+        response = self.post(b'%PDF-' + b'x' * 500)
+        self.assertFormError(response.context['form'], 'pdf_file', 'File is larger than 100\xa0bytes.')
+        response = self.post(b'%PDF-' + b'x' * 200_000)
+        self.assertEqual(response.status_code, 413)
+        self.assertContains(response, 'File is larger than 100\xa0bytes.', status_code=413)
+        self.assertEqual(self.stored_files(), [])
+
+    def test_csrf_still_enforced(self):
+        client = Client(enforce_csrf_checks=True)
+        client.login(username='warden', password='pass')
+        self.assertEqual(self.post(b'%PDF-1.7', client=client).status_code, 403)
+
+    @override_settings(MESS_PLAN_MAX_UPLOAD_SIZE=100)
+    def test_oversized_upload_reported_with_csrf_checks(self):
+        client = Client(enforce_csrf_checks=True)
+        client.login(username='warden', password='pass')
+        client.get(reverse('upload_mess_plan'))
+        token = client.cookies['csrftoken'].value
+        for size, status in ((500, 200), (200_000, 413)):
+            response = client.post(reverse('upload_mess_plan'), {
+                'csrfmiddlewaretoken': token, 'month': '2025-05',
+                'pdf_file': SimpleUploadedFile('menu.pdf', b'%PDF-' + b'x' * size),
+            })
+            self.assertContains(response, 'File is larger than 100\xa0bytes.', status_code=status)
+        self.assertFalse(MessPlan.objects.exists())
+
+
+class SystemCheckTests(TestCase):
+    def test_missing_pdf_renderer_reported(self):
+        with mock.patch('importlib.util.find_spec', return_value=None):
+            warnings = checks.mess_preview_renderer(None)
+        self.assertEqual([w.id for w in warnings], ['core.W001'])
+
+
+def menu_pdf(text):
+    import pymupdf
+    document = pymupdf.open()
+    document.new_page().insert_text((72, 72), text)
+    return document.tobytes()
+
+
+@skipUnless(importlib.util.find_spec('pymupdf'), "PyMuPDF is not installed")
+@override_settings(JOBS_RUN_INLINE=True)
+class MessPlanPreviewTests(HostelFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        media_override = override_settings(MEDIA_ROOT=self.media)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.student = self.add_students(1)[0]
+        User.objects.create_user(username='kid', password='pass', role='Student', student=self.student)
+
+    def upload(self, text, month=None):
+        self.client.login(username='warden', password='pass')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('upload_mess_plan'), {
+                'month': month or timezone.now().strftime('%Y-%m'),
+                'pdf_file': SimpleUploadedFile('menu.pdf', menu_pdf(text)),
+            })
+        return MessPlan.objects.get(hostel=self.hostel, month=month or timezone.now().strftime('%Y-%m'))
+
+    def test_upload_builds_text_and_thumbnail(self):
+        plan = self.upload("Monday: Chicken Biryani")
+        self.assertIn("Chicken Biryani", plan.menu_text)
+        digest = os.path.splitext(os.path.basename(plan.pdf_file.name))[0]
+        self.assertEqual(plan.thumbnail.name, f'mess_previews/{digest}.png')
+        with plan.thumbnail.open('rb') as f:
+            self.assertEqual(f.read(8), b'\x89PNG\r\n\x1a\n')
+
+        self.client.login(username='kid', password='pass')
+        response = self.client.get(reverse('student_dashboard'))
+        self.assertContains(response, "Chicken Biryani")
+        self.assertContains(response, plan.get_thumbnail_url())
+        response = self.client.get(plan.get_thumbnail_url())
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_new_file_replaces_preview_and_cache_is_reused(self):
+        plan = self.upload("Daal Chawal")
+        self.upload("Nihari")
+        plan.refresh_from_db()
+        self.assertIn("Nihari", plan.menu_text)
+        self.assertNotIn("Daal", plan.menu_text)
+
+        other = MessPlan.objects.create(hostel=self.hostel, month='2024-01', pdf_file=plan.pdf_file.name)
+        with mock.patch('core.mess_previews.render_pdf') as render:
+            self.assertTrue(build_preview(other.pk))
+        render.assert_not_called()
+        other.refresh_from_db()
+        self.assertEqual((other.menu_text, other.thumbnail.name), (plan.menu_text, plan.thumbnail.name))
+
+    def test_rebuilding_never_leaves_renamed_copies(self):
+        plan = self.upload("Aloo Gobi")
+        digest = os.path.splitext(os.path.basename(plan.pdf_file.name))[0]
+        os.remove(os.path.join(self.media, 'mess_previews', f'{digest}.txt'))
+        self.assertTrue(build_preview(plan.pk))
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(self.media, 'mess_previews'))), [f'{digest}.png', f'{digest}.txt'],
+        )
+
+    def test_search_matches_stored_text_within_hostel(self):
+        self.upload("Friday: Haleem", month='2025-03')
+        self.upload("Saturday: Karahi", month='2025-04')
+        elsewhere = Hostel.objects.create(name='South', address='2 Road', owner=self.owner)
+        MessPlan.objects.create(hostel=elsewhere, month='2025-03', pdf_file='x.pdf', menu_text='Haleem')
+
+        self.client.login(username='kid', password='pass')
+        with mock.patch('core.mess_previews.render_pdf') as render:
+            response = self.client.get(reverse('search_mess_plans'), {'q': 'haleem'})
+        render.assert_not_called()
+        self.assertEqual([plan.month for plan in response.context['plans']], ['2025-03'])
+        self.assertEqual(response.context['plans'][0].hostel, self.hostel)
+
+    def test_thumbnail_hidden_from_other_hostels(self):
+        plan = self.upload("Paratha")
+        elsewhere = Hostel.objects.create(name='South', address='2 Road', owner=self.owner)
+        User.objects.create_user(username='other', password='pass', role='Warden', hostel=elsewhere)
+        self.client.login(username='other', password='pass')
+        self.assertEqual(self.client.get(plan.get_thumbnail_url()).status_code, 404)
+
+
+class JobQueueTests(HostelFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.calls = []
+        tasks = mock.patch.dict(jobs.TASKS, {'flaky': self.flaky})
+        tasks.start()
+        self.addCleanup(tasks.stop)
+
+    def flaky(self, fail_times=0):
+        self.calls.append(fail_times)
+        if len(self.calls) <= fail_times:
+            raise RuntimeError("boom")
+        return {'summary': "done"}
+
+    def test_failures_retried_with_backoff_then_given_up(self):
+        job = jobs.enqueue('flaky', fail_times=5, max_attempts=2)
+        with self.assertLogs('core.jobs', 'WARNING'):
+            jobs.run(jobs.claim())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertIn("RuntimeError: boom", job.error)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIsNone(jobs.claim())
+
+        Job.objects.update(run_after=timezone.now())
+        with self.assertLogs('core.jobs', 'WARNING'):
+            jobs.run(jobs.claim())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+
+    def test_claim_is_exclusive_and_worker_runs_due_jobs(self):
+        first = jobs.enqueue('flaky')
+        jobs.enqueue('flaky', fail_times=1)
+        self.assertEqual(jobs.claim(), first)
+        self.assertIsNone(jobs.claim(first.pk))
+
+        # A long run is left alone while its worker keeps the heartbeat up.
+        Job.objects.filter(pk=first.pk).update(started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(jobs.requeue_stale(), 0)
+
+        Job.objects.filter(pk=first.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        out = StringIO()
+        with self.assertLogs('core.jobs', 'WARNING'):
+            call_command('run_jobs', '--burst', stdout=out)
+        self.assertIn("Ran 2 job(s).", out.getvalue())
+        self.assertEqual(list(Job.objects.order_by('pk').values_list('status', 'attempts')), [
+            ('succeeded', 2), ('queued', 1),
+        ])
+
+    def test_job_given_up_as_stale_keeps_its_outcome(self):
+        def stalled():
+            # Its worker looks dead to everyone else while it still runs.
+            Job.objects.update(heartbeat_at=timezone.now() - timedelta(hours=1))
+            self.assertEqual(jobs.requeue_stale(), 1)
+            return {'summary': "late"}
+
+        jobs.TASKS['stalled'] = stalled
+        job = jobs.enqueue('stalled', max_attempts=1)
+        with self.assertLogs('core.jobs', 'WARNING') as logs:
+            jobs.run(jobs.claim())
+        self.assertIn("given up as stale", logs.output[0])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), ('failed', None))
+
+    def test_worker_looks_for_stale_jobs_while_busy(self):
+        for _ in range(3):
+            jobs.enqueue('flaky')
+        with mock.patch('core.management.commands.run_jobs.STALE_CHECK_INTERVAL', 0), \
+                mock.patch('core.management.commands.run_jobs.requeue_stale', return_value=0) as requeue:
+            call_command('run_jobs', '--burst', stdout=StringIO())
+        self.assertEqual(requeue.call_count, 4)
+
+    def test_worker_clears_expired_sessions(self):
+        expired = SessionStore()
+        expired.set_expiry(-1)
+        expired.save()
+        current = SessionStore()
+        current.save()
+        call_command('run_jobs', '--burst', stdout=StringIO())
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), [current.session_key])
+
+    def test_status_polling_limited_to_owner(self):
+        job = jobs.enqueue('flaky', user=self.warden)
+        self.client.login(username='warden', password='pass')
+        response = self.client.get(reverse('job_status', args=[job.pk]))
+        self.assertEqual(response.json()['status'], 'queued')
+        self.assertContains(self.client.get(job.get_absolute_url()), 'http-equiv="refresh"')
+
+        jobs.run_job(job.pk)
+        self.assertEqual(self.client.get(reverse('job_status', args=[job.pk])).json()['result'], {'summary': "done"})
+        self.client.login(username='owner', password='pass')
+        self.assertEqual(self.client.get(reverse('job_status', args=[job.pk])).status_code, 404)
@@ -0,0 +1,96 @@
+"""Streaming upload handling for mess plans.
+
+``MessPlanUploadHandler`` replaces Django's memory/temporary-file
+handlers for the mess plan upload view. Each chunk is hashed and written
+straight into the plan's content-addressed storage, so memory use stays
+at one chunk whatever the file size and nothing is copied again on save.
+Requests that declare a body over ``MESS_PLAN_MAX_UPLOAD_SIZE`` are
+refused before any of it is read (by the view, with a 413, since the CSRF
+token in that body is never seen either); a file that grows past the limit, or
+does not start with the PDF magic bytes, stops the upload at that chunk.
+"""
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from django.http import QueryDict
+from django.template.defaultfilters import filesizeformat
+from django.utils.datastructures import MultiValueDict
+
+from .models import MessPlan
+
+PDF_MAGIC = b'%PDF-'
+# Room for the month field and multipart boundaries around the file.
+FORM_OVERHEAD = 64 * 1024
+
+
+class StoredUpload(UploadedFile):
+    """An upload that is already in storage under ``stored_name``."""
+
+    def __init__(self, name, size, content_type, stored_name, storage):
+        super().__init__(file=None, name=name, content_type=content_type, size=size)
+        self.stored_name = stored_name
+        self.storage = storage
+
+    def open(self, mode='rb'):
+        self.file = self.storage.open(self.stored_name, mode)
+        return self
+
+
+class MessPlanUploadHandler(FileUploadHandler):
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_size = settings.MESS_PLAN_MAX_UPLOAD_SIZE
+        self.field = MessPlan._meta.get_field('pdf_file')
+        self.error = None
+        self.writer = None
+        self.header = None
+
+    def too_large(self):
+        return f"File is larger than {filesizeformat(self.max_size)}."
+
+    def refuses(self, content_length):
+        """Whether a body of ``content_length`` bytes is too large to read;
+        if so, ``error`` says why."""
+        if content_length > self.max_size + FORM_OVERHEAD:
+            self.error = self.too_large()
+            return True
+        return False
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if self.refuses(content_length):
+            # Returning the parsed data ourselves means the body is never read.
+            return QueryDict(encoding=encoding), MultiValueDict()
+        return None
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.writer = self.field.storage.blob_writer(self.field.generate_filename(None, self.file_name))
+        self.header = b''
+
+    def abort(self, message):
+        self.error = message
+        self.writer.discard()
+        # The parser skips the rest of the body without reading it.
+        raise StopUpload(connection_reset=True)
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.max_size:
+            self.abort(self.too_large())
+        if self.header is not None:
+            self.header += raw_data
+            if len(self.header) < len(PDF_MAGIC):
+                return None
+            if not self.header.startswith(PDF_MAGIC):
+                self.abort("File is not a PDF.")
+            raw_data, self.header = self.header, None
+        self.writer.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if self.header is not None:
+            self.writer.discard()
+            self.error = "File is not a PDF."
+            return None
+        return StoredUpload(
+            self.file_name, file_size, self.content_type, self.writer.commit(), self.field.storage,
+        )
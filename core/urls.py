@@ -5,17 +5,29 @@ urlpatterns = [
   path('', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('student/dashboard/', views.student_dashboard, name='student_dashboard'),
+    path('student/statement/', views.student_statement, name='student_statement'),
     path('warden/dashboard/', views.warden_dashboard, name='warden_dashboard'),
     path('owner/dashboard/', views.owner_dashboard, name='owner_dashboard'),
+    path('owner/export/<str:kind>/', views.export_data, name='export_data'),
     path('admin/dashboard/', views.admin_dashboard, name='admin_dashboard'),
+    path('monitoring/cache_stats/', views.cache_stats, name='cache_stats'),
     path('warden/register_student/', views.register_student, name='register_student'),
     path('warden/create_room/', views.create_room, name='create_room'),
+    path('warden/build_rooms/', views.build_rooms, name='build_rooms'),
     path('warden/allocate_room/<int:student_id>/', views.allocate_room, name='allocate_room'),
+    path('warden/batch_allocate/', views.batch_allocate, name='batch_allocate'),
     path('warden/manage_fees/<int:student_id>/', views.manage_fees, name='manage_fees'),
+    path('warden/generate_monthly_fees/', views.generate_monthly_fees, name='generate_monthly_fees'),
     path('warden/upload_mess_plan/', views.upload_mess_plan, name='upload_mess_plan'),
+    path('mess_plans/<int:plan_id>/download/', views.download_mess_plan, name='download_mess_plan'),
+    path('mess_plans/<int:plan_id>/thumbnail/', views.mess_plan_thumbnail, name='mess_plan_thumbnail'),
+    path('mess_plans/search/', views.search_mess_plans, name='search_mess_plans'),
+    path('jobs/<int:job_id>/', views.job_detail, name='job_detail'),
+    path('jobs/<int:job_id>/status/', views.job_status, name='job_status'),
     path('warden/add_expense/', views.add_expense, name='add_expense'),
     path('warden/manage_categories/', views.manage_categories, name='manage_categories'),
     path('warden/create_student_user/', views.create_student_user, name='create_student_user'),
+    path('warden/import_students/', views.import_students, name='import_students'),
     path('warden/update_student_cnic/<int:student_id>/', views.update_student_cnic, name='update_student_cnic'),
     path('warden/update_student_emergency_contact/<int:student_id>/', views.update_student_emergency_contact, name='update_student_emergency_contact'),
 ]
\ No newline at end of file
@@ -1,13 +1,32 @@
+import csv
+import io
+from functools import wraps
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import user_passes_test, login_required
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
-from django.http import HttpResponseForbidden
+from django.http import HttpResponseBadRequest, HttpResponseForbidden, Http404, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
-from django.db.models import Sum, F, Count
+from django.db import transaction
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.db.models import Sum, F, Count, Q
 from .models import *
 from .forms import *
-from functools import wraps
+from . import caching, exports, jobs, reports
+from .downloads import serve_file
+from .uploads import MessPlanUploadHandler
+from .allocation import (
+    AllocationError, allocate_bed, apply_allocation, load_plan, plan_allocation, sign_plan, unassigned_requests,
+)
+from .pagination import keyset_page
+from .rooms import RoomBuildError, create_beds, create_room_range, room_numbers
+
+STUDENTS_PER_PAGE = 50
+RECENT_FEES = 10
+STATEMENT_PERIODS_PER_PAGE = 12
+MESS_PLAN_MAX_AGE = 365 * 24 * 60 * 60
+MESS_PLAN_SEARCH_RESULTS = 50
 
 def role_required(role):
     @wraps(role_required)
@@ -67,7 +86,25 @@ def logout_view(request):
 @role_required('Student')
 def student_dashboard(request):
     student = request.user.student
-    fees = StudentFee.objects.filter(student=student)
+    if not student:
+        return render(request, 'student_dashboard.html', {
+            'user': request.user, 'error': "No student profile is linked to this account.",
+        })
+    # One-time fees such as the security deposit are always listed; only
+    # the monthly ones are cut down to the most recent.
+    recent = (
+        StudentFee.objects.filter(student=student, period__isnull=False)
+        .order_by('-period', '-id').values('id')[:RECENT_FEES]
+    )
+    fees = (
+        StudentFee.objects.filter(student=student)
+        .filter(Q(period__isnull=True) | Q(id__in=recent))
+        .select_related('fee_type')
+        .order_by(F('period').desc(nulls_first=True), '-id')
+    )
+    outstanding = StudentFee.objects.filter(student=student).aggregate(
+        total=Sum('due_amount') - Sum('paid_amount')
+    )['total'] or 0
     mess_plan = MessPlan.objects.filter(
         hostel=student.hostel,
         month=timezone.now().strftime('%Y-%m')
@@ -76,10 +113,84 @@ def student_dashboard(request):
         'user': request.user,
         'student': student,
         'fees': fees,
+        'outstanding': outstanding,
         'mess_plan': mess_plan,
     }
     return render(request, 'student_dashboard.html', context)
 
+@role_required('Student')
+def student_statement(request):
+    student = request.user.student
+    if not student:
+        return render(request, 'student_statement.html', {
+            'user': request.user, 'error': "No student profile is linked to this account.",
+        })
+    statement = reports.fee_statement(
+        student, after=request.GET.get('after'), before=request.GET.get('before'), size=STATEMENT_PERIODS_PER_PAGE,
+    )
+    context = {
+        'user': request.user,
+        'student': student,
+        'periods': statement['items'],
+        'one_time_fees': statement['one_time'],
+        'totals': statement['totals'],
+        'next_cursor': statement['next_cursor'],
+        'prev_cursor': statement['prev_cursor'],
+    }
+    return render(request, 'student_statement.html', context)
+
+def _visible_mess_plans(user):
+    """Mess plans ``user`` may open: all of them for admins, their own
+    hostels' for owners and the hostel they belong to otherwise."""
+    plans = MessPlan.objects.all()
+    if user.is_superuser or user.role == 'Admin':
+        return plans
+    if user.role == 'Owner':
+        return plans.filter(hostel__owner=user)
+    if user.role == 'Warden' and user.hostel_id is not None:
+        return plans.filter(hostel_id=user.hostel_id)
+    if user.role == 'Student' and user.student is not None:
+        return plans.filter(hostel_id=user.student.hostel_id)
+    return plans.none()
+
+def _serve_mess_plan_file(request, plan_id, field, content_type, filename):
+    if not request.user.is_authenticated:
+        return HttpResponseForbidden("You must be logged in to access this page.")
+    plan = _visible_mess_plans(request.user).filter(pk=plan_id).first()
+    fieldfile = getattr(plan, field, None)
+    if not fieldfile:
+        raise Http404("Mess plan not found.")
+    # A URL carrying the current version never changes content; anything
+    # else must revalidate so a re-uploaded plan shows up at once.
+    if request.GET.get('v') == plan.version:
+        cache_control = f'private, max-age={MESS_PLAN_MAX_AGE}, immutable'
+    else:
+        cache_control = 'private, no-cache'
+    try:
+        return serve_file(request, fieldfile, content_type, cache_control, filename=filename.format(plan=plan))
+    except FileNotFoundError:
+        raise Http404("Mess plan file is missing.")
+
+def download_mess_plan(request, plan_id):
+    return _serve_mess_plan_file(request, plan_id, 'pdf_file', 'application/pdf', 'mess-plan-{plan.month}.pdf')
+
+def mess_plan_thumbnail(request, plan_id):
+    return _serve_mess_plan_file(request, plan_id, 'thumbnail', 'image/png', 'mess-plan-{plan.month}.png')
+
+def search_mess_plans(request):
+    if not request.user.is_authenticated:
+        return HttpResponseForbidden("You must be logged in to access this page.")
+    query = request.GET.get('q', '').strip()
+    plans = []
+    if query:
+        plans = (
+            _visible_mess_plans(request.user)
+            .filter(menu_text__icontains=query)
+            .select_related('hostel')
+            .order_by('-month', 'hostel__name')[:MESS_PLAN_SEARCH_RESULTS]
+        )
+    return render(request, 'search_mess_plans.html', {'query': query, 'plans': plans})
+
 @role_required('Warden')
 def warden_dashboard(request):
     hostel = request.user.hostel
@@ -87,22 +198,37 @@ def warden_dashboard(request):
         messages.error(request, "No hostel is linked to this warden. Please contact the admin.")
         return redirect('logout')
 
-    students = Student.objects.filter(hostel=hostel).prefetch_related('room', 'bed', 'fees')
+    students = Student.objects.filter(hostel=hostel).select_related('assigned_bed__room')
+    query = request.GET.get('q', '').strip()
+    if query:
+        students = students.filter(
+            Q(name__icontains=query) | Q(cnic__icontains=query) | Q(assigned_bed__room__room_number__iexact=query)
+        )
+    page = keyset_page(
+        students, ('name', 'id'),
+        after=request.GET.get('after'), before=request.GET.get('before'),
+        size=STUDENTS_PER_PAGE,
+    )
     fees = StudentFee.objects.filter(student__hostel=hostel)
     expenses = Expense.objects.filter(hostel=hostel)
 
-    fees_summary = {}
-    for student in students:
-        student_fees = fees.filter(student=student)
-        fees_summary[student.id] = {}
-        for fee in student_fees:
-            fees_summary[student.id][fee.fee_type.name.lower()] = fee
-
-    total_fees = fees.aggregate(Sum('paid_amount'))['paid_amount__sum'] or 0
-    total_expenses = expenses.aggregate(Sum('amount'))['amount__sum'] or 0
-    current_funds = total_fees - total_expenses
+    page_ids = [s.id for s in page['items']]
+    fees_summary = caching.cached(
+        [hostel.id], 'fee_matrix:' + ','.join(map(str, page_ids)),
+        lambda: reports.build_fee_matrix(fees.filter(student__in=page_ids)),
+    )
+    rooms = caching.cached([hostel.id], 'rooms', lambda: list(
+        hostel.rooms.order_by('room_number').values('room_number', 'number_of_beds', 'occupied_beds')
+    ))
+    totals = caching.cached([hostel.id], 'totals', lambda: {
+        'fees': fees.aggregate(Sum('paid_amount'))['paid_amount__sum'] or 0,
+        'expenses': expenses.aggregate(Sum('amount'))['amount__sum'] or 0,
+    })
+    total_fees = totals['fees']
+    total_expenses = totals['expenses']
+    current_funds = hostel.total_funds
 
-    recent_expenses = expenses.order_by('-date')[:5]
+    recent_expenses = expenses.select_related('category').order_by('-date')[:5]
     mess_plan = MessPlan.objects.filter(
         hostel=hostel,
         month=timezone.now().strftime('%Y-%m')
@@ -111,8 +237,13 @@ def warden_dashboard(request):
     context = {
         'user': request.user,
         'hostel': hostel,
-        'students': students,
+        'students': page['items'],
+        'student_count': students.count(),
+        'query': query,
+        'next_cursor': page['next_cursor'],
+        'prev_cursor': page['prev_cursor'],
         'fees_summary': fees_summary,
+        'rooms': rooms,
         'total_fees': total_fees,
         'total_expenses': total_expenses,
         'current_funds': current_funds,
@@ -124,7 +255,8 @@ def warden_dashboard(request):
 @role_required('Owner')
 def owner_dashboard(request):
     try:
-        hostels = Hostel.objects.filter(owner=request.user)
+        owned = Hostel.objects.filter(owner=request.user)
+        hostels = list(owned)
         if not hostels:
             messages.warning(request, "No hostels are assigned to this owner.")
             return render(request, 'owner_dashboard.html', {
@@ -133,65 +265,9 @@ def owner_dashboard(request):
                 'warden_form': WardenUserForm()  # Ensure form is available even if no hostels
             })
 
-        # Seat availability across all hostels
-        seat_availability = []
-        for hostel in hostels:
-            rooms = Room.objects.filter(hostel=hostel)
-            for room in rooms:
-                total_beds = room.number_of_beds
-                occupied = room.occupants.count()
-                available = total_beds - occupied
-                seat_availability.append({
-                    'hostel': hostel.name,
-                    'room': room.room_number,
-                    'total_beds': total_beds,
-                    'occupied': occupied,
-                    'available': available
-                })
-
-        # Unpaid students and pending fee status
-        unpaid_students = []
-        for hostel in hostels:
-            students = Student.objects.filter(hostel=hostel).prefetch_related('fees')
-            for student in students:
-                fees = student.fees.all()
-                pending = fees.filter(paid_amount__lt=F('due_amount')).aggregate(total_pending=Sum('due_amount') - Sum('paid_amount'))['total_pending'] or 0
-                if pending > 0:
-                    unpaid_students.append({
-                        'student': student.name,
-                        'hostel': hostel.name,
-                        'pending_amount': pending
-                    })
-
-        # Expenses by category
-        expenses_by_category = Expense.objects.filter(hostel__in=hostels).values('category__name').annotate(total=Sum('amount')).order_by('category__name')
-
-        # Security fee totals
-        security_fees = StudentFee.objects.filter(student__hostel__in=hostels, fee_type__name__iexact='security').aggregate(total_security=Sum('paid_amount'))['total_security'] or 0
-
-        # Total revenue
-        total_fees_collected = StudentFee.objects.filter(student__hostel__in=hostels).aggregate(total=Sum('paid_amount'))['total'] or 0
-        total_expenses = Expense.objects.filter(hostel__in=hostels).aggregate(total=Sum('amount'))['total'] or 0
-        total_revenue = total_fees_collected - total_expenses
-
-        # Hostel revenue report
-        hostel_revenue = []
-        for hostel in hostels:
-            hostel_fees = StudentFee.objects.filter(student__hostel=hostel).aggregate(total=Sum('paid_amount'))['total'] or 0
-            hostel_expenses = Expense.objects.filter(hostel=hostel).aggregate(total=Sum('amount'))['total'] or 0
-            hostel_revenue.append({
-                'hostel': hostel.name,
-                'fees_collected': hostel_fees,
-                'expenses': hostel_expenses,
-                'revenue': hostel_fees - hostel_expenses
-            })
-
-        # Initialize the form with filtered hostel choices
-        form = WardenUserForm(initial={'hostel': hostels.first() if hostels else None})
-        form.fields['hostel'].queryset = hostels  # Limit hostel choices to owner's hostels
-
         if request.method == 'POST':
             form = WardenUserForm(request.POST)
+            limit_hostel_choices(form.fields['hostel'], owned, hostels)
             if form.is_valid():
                 try:
                     hostel = form.cleaned_data['hostel']
@@ -212,8 +288,14 @@ def owner_dashboard(request):
                 messages.error(request, "Form validation failed: " + str(form.errors))
         else:
             form = WardenUserForm()
-            form.fields['hostel'].queryset = hostels
-
+            limit_hostel_choices(form.fields['hostel'], owned, hostels)
+        export_form = ExportFilterForm()
+        limit_hostel_choices(export_form.fields['hostel'], owned, hostels)
+
+        summary = caching.cached(
+            [hostel.id for hostel in hostels], 'owner_summary',
+            lambda: reports.owner_summary(hostels),
+        )
         context = {
             'user': request.user,
             'hostels': hostels,
@@ -221,13 +303,9 @@ def owner_dashboard(request):
             'fees': StudentFee.objects.filter(student__hostel__in=hostels),
             'expenses': Expense.objects.filter(hostel__in=hostels),
             'mess_plans': MessPlan.objects.filter(hostel__in=hostels, month=timezone.now().strftime('%Y-%m')),
-            'seat_availability': seat_availability,
-            'unpaid_students': unpaid_students,
-            'expenses_by_category': expenses_by_category,
-            'security_fees': security_fees,
-            'total_revenue': total_revenue,
-            'hostel_revenue': hostel_revenue,
             'warden_form': form,
+            'export_form': export_form,
+            **summary,
         }
         return render(request, 'owner_dashboard.html', context)
 
@@ -239,6 +317,23 @@ def owner_dashboard(request):
             'warden_form': WardenUserForm()  # Provide a default form in case of error
         })
 
+@role_required('Owner')
+def export_data(request, kind):
+    if kind not in exports.EXPORTS:
+        raise Http404("Unknown export.")
+    hostels = Hostel.objects.filter(owner=request.user)
+    form = ExportFilterForm(request.GET, hostels=hostels)
+    if not form.is_valid():
+        return HttpResponseBadRequest("Invalid export filter: " + str(form.errors))
+    if form.cleaned_data['hostel']:
+        hostels = hostels.filter(pk=form.cleaned_data['hostel'].pk)
+
+    rows = exports.export_rows(kind, hostels, form.cleaned_data['start'], form.cleaned_data['end'])
+    response = StreamingHttpResponse(rows, content_type='text/csv')
+    filename = f"{kind}-{timezone.now().strftime('%Y%m%d')}.csv"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
 @role_required('Admin')
 def admin_dashboard(request):
     context = {
@@ -246,6 +341,10 @@ def admin_dashboard(request):
     }
     return render(request, 'admin_dashboard.html', context)
 
+@role_required('Admin')
+def cache_stats(request):
+    return JsonResponse(caching.stats())
+
 @role_required('Warden')
 def register_student(request):
     if not request.user.hostel:
@@ -273,17 +372,40 @@ def create_room(request):
     if request.method == 'POST':
         form = RoomForm(request.POST)
         if form.is_valid():
-            room = form.save(commit=False)
-            room.hostel = request.user.hostel
-            room.save()
-            for i in range(1, room.number_of_beds + 1):
-                Bed.objects.create(room=room, bed_number=i)
+            with transaction.atomic():
+                room = form.save(commit=False)
+                room.hostel = request.user.hostel
+                room.save()
+                create_beds([room])
             messages.success(request, f"Room {room.room_number} created successfully")
             return redirect('warden_dashboard')
     else:
         form = RoomForm()
     return render(request, 'create_room.html', {'form': form})
 
+@role_required('Warden')
+def build_rooms(request):
+    if not request.user.hostel:
+        messages.error(request, "No hostel is linked to this warden. Please contact the admin.")
+        return redirect('warden_dashboard')
+
+    if request.method == 'POST':
+        form = RoomRangeForm(request.POST)
+        if form.is_valid():
+            numbers = room_numbers(
+                form.cleaned_data['start'], form.cleaned_data['end'], form.cleaned_data['prefix']
+            )
+            try:
+                created = create_room_range(request.user.hostel, numbers, form.cleaned_data['bed_type'])
+            except RoomBuildError as e:
+                form.add_error(None, str(e))
+            else:
+                messages.success(request, f"Created {len(created)} room(s) from {numbers[0]} to {numbers[-1]}")
+                return redirect('warden_dashboard')
+    else:
+        form = RoomRangeForm()
+    return render(request, 'build_rooms.html', {'form': form})
+
 @role_required('Warden')
 def allocate_room(request, student_id):
     student = get_object_or_404(Student, id=student_id, hostel=request.user.hostel)
@@ -291,32 +413,69 @@ def allocate_room(request, student_id):
         form = RoomAllocationForm(request.POST, hostel=request.user.hostel)
         if form.is_valid():
             room = form.cleaned_data['room']
-            available_bed = Bed.objects.filter(room=room, student__isnull=True).first()
-            if available_bed:
-                if student.bed:
-                    student.bed.student = None
-                    student.bed.save()
-                student.room = room
-                student.bed = available_bed
-                available_bed.student = student
-                student.save()
-                available_bed.save()
+            try:
+                allocate_bed(student, room)
+            except AllocationError as e:
+                messages.error(request, str(e))
+            else:
                 messages.success(request, f"Room allocated to {student.name} successfully")
                 return redirect('warden_dashboard')
-            else:
-                messages.error(request, "No available beds in the selected room.")
     else:
         form = RoomAllocationForm(hostel=request.user.hostel)
     return render(request, 'allocate_room.html', {'form': form, 'student': student})
 
+@role_required('Warden')
+def batch_allocate(request):
+    hostel = request.user.hostel
+    if not hostel:
+        messages.error(request, "No hostel is linked to this warden. Please contact the admin.")
+        return redirect('warden_dashboard')
+
+    plan = signed_plan = None
+    if request.method == 'POST' and 'apply' in request.POST:
+        # Apply exactly the plan that was previewed, not a fresh one.
+        try:
+            allocated = apply_allocation(load_plan(hostel, request.POST.get('plan')))
+        except AllocationError as e:
+            messages.error(request, str(e))
+            return redirect('batch_allocate')
+        messages.success(request, f"Allocated beds to {allocated} student(s)")
+        return redirect('warden_dashboard')
+    if request.method == 'POST':
+        form = BatchAllocationForm(request.POST, request.FILES)
+        if form.is_valid():
+            preferences = form.cleaned_data['preferences']
+            try:
+                rows = list(csv.DictReader(io.TextIOWrapper(preferences, encoding='utf-8-sig'))) if preferences else None
+            except (ValueError, csv.Error) as e:
+                form.add_error('preferences', f"Could not read file: {e}")
+            else:
+                requests = unassigned_requests(
+                    hostel, rows, form.cleaned_data['bed_type'], form.cleaned_data['room_prefix']
+                )
+                plan = plan_allocation(hostel, requests)
+                signed_plan = sign_plan(hostel, plan)
+    else:
+        form = BatchAllocationForm()
+    return render(request, 'batch_allocate.html', {'form': form, 'plan': plan, 'signed_plan': signed_plan})
+
 @role_required('Warden')
 def manage_fees(request, student_id):
     student = get_object_or_404(Student, id=student_id, hostel=request.user.hostel)
     if request.method == 'POST':
         form = StudentFeeForm(request.POST)
         if form.is_valid():
-            fee = form.save(commit=False)
-            fee.student = student
+            # One fee per (student, fee type, period): re-submitting updates it.
+            period = form.cleaned_data['period']
+            fee = period and StudentFee.objects.filter(
+                student=student, fee_type=form.cleaned_data['fee_type'], period=period
+            ).first()
+            if fee:
+                fee.due_amount = form.cleaned_data['due_amount']
+                fee.paid_amount = form.cleaned_data['paid_amount']
+            else:
+                fee = form.save(commit=False)
+                fee.student = student
             fee.save()
             messages.success(request, f"Fee updated for {student.name}")
             return redirect('warden_dashboard')
@@ -329,17 +488,72 @@ def manage_fees(request, student_id):
         'existing_fees': existing_fees
     })
 
+@role_required('Warden')
+def generate_monthly_fees(request):
+    if not request.user.hostel:
+        messages.error(request, "No hostel is linked to this warden. Please contact the admin.")
+        return redirect('warden_dashboard')
+
+    if request.method == 'POST':
+        form = MonthlyFeeGenerationForm(request.POST)
+        if form.is_valid():
+            period = form.cleaned_data['period']
+            amounts = {name: str(amount) for name, amount in form.amounts().items()}
+            job = jobs.enqueue(
+                'generate_monthly_fees', user=request.user,
+                hostel_id=request.user.hostel_id, period=period, amounts=amounts,
+            )
+            messages.success(request, f"Fee generation for {period} has been queued")
+            return redirect(job)
+    else:
+        form = MonthlyFeeGenerationForm(initial={'period': timezone.now().strftime('%Y-%m')})
+    return render(request, 'generate_monthly_fees.html', {'form': form})
+
+@csrf_exempt
 @role_required('Warden')
 def upload_mess_plan(request):
+    # Upload handlers must be in place before anything reads request.POST,
+    # so CSRF is checked in the inner view instead of by the middleware.
+    handler = MessPlanUploadHandler(request)
+    if request.method == 'POST' and handler.refuses(_content_length(request)):
+        # Refused unread, CSRF token included; nothing changes, so say why
+        # rather than failing the CSRF check on an empty POST.
+        return render(
+            request, 'upload_mess_plan.html', {'form': MessPlanForm(), 'upload_error': handler.error}, status=413,
+        )
+    request.upload_handlers = [handler]
+    return _upload_mess_plan(request, handler)
+
+def _content_length(request):
+    try:
+        return int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return 0
+
+@csrf_protect
+def _upload_mess_plan(request, handler):
     if not request.user.hostel:
         messages.error(request, "No hostel is linked to this warden. Please contact the admin.")
         return redirect('warden_dashboard')
 
     if request.method == 'POST':
         form = MessPlanForm(request.POST, request.FILES)
-        if form.is_valid():
-            mess_plan = form.save(commit=False)
-            mess_plan.hostel = request.user.hostel
+        valid = form.is_valid()
+        if handler.error:
+            # The handler refused the file, so report why instead of "required".
+            form.errors.pop('pdf_file', None)
+            form.add_error('pdf_file', handler.error)
+            valid = False
+        if valid:
+            # A month has one plan per hostel; uploading again replaces its file.
+            mess_plan = MessPlan.objects.filter(
+                hostel=request.user.hostel, month=form.cleaned_data['month']
+            ).first()
+            if not mess_plan:
+                mess_plan = form.save(commit=False)
+                mess_plan.hostel = request.user.hostel
+            # The handler already stored the file; point the plan at it.
+            mess_plan.pdf_file = form.cleaned_data['pdf_file'].stored_name
             mess_plan.save()
             messages.success(request, "Mess plan uploaded successfully")
             return redirect('warden_dashboard')
@@ -412,6 +626,50 @@ def create_student_user(request):
         form = StudentUserForm()
     return render(request, 'create_student_user.html', {'form': form})
 
+@role_required('Warden')
+def import_students(request):
+    if not request.user.hostel:
+        messages.error(request, "No hostel is linked to this warden. Please contact the admin.")
+        return redirect('warden_dashboard')
+
+    if request.method == 'POST':
+        form = StudentImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            # The file travels with the job: the worker may run elsewhere.
+            job = jobs.enqueue(
+                'import_students', user=request.user, max_attempts=1, payload=upload.read(),
+                hostel_id=request.user.hostel_id, filename=upload.name,
+            )
+            messages.success(request, "Student import has been queued")
+            return redirect(job)
+    else:
+        form = StudentImportForm()
+    return render(request, 'import_students.html', {'form': form})
+
+def _user_job(request, job_id):
+    jobs_for_user = Job.objects.all() if request.user.is_superuser else Job.objects.filter(created_by=request.user)
+    return get_object_or_404(jobs_for_user, pk=job_id)
+
+def job_detail(request, job_id):
+    if not request.user.is_authenticated:
+        return HttpResponseForbidden("You must be logged in to access this page.")
+    return render(request, 'job_detail.html', {'job': _user_job(request, job_id)})
+
+def job_status(request, job_id):
+    if not request.user.is_authenticated:
+        return HttpResponseForbidden("You must be logged in to access this page.")
+    job = _user_job(request, job_id)
+    return JsonResponse({
+        'id': job.pk,
+        'task': job.task,
+        'status': job.status,
+        'done': job.done,
+        'attempts': job.attempts,
+        'result': job.result,
+        'error': job.error.strip().splitlines()[-1] if job.status == 'failed' and job.error else '',
+    })
+
 @role_required('Warden')
 def update_student_cnic(request, student_id):
     student = get_object_or_404(Student, id=student_id, hostel=request.user.hostel)
@@ -5,6 +5,7 @@ Django settings for hms project.
 from pathlib import Path
 import os
 import dj_database_url
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 # Load environment variables from .env file if it exists
@@ -32,6 +33,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -50,6 +52,45 @@ DATABASES = {
     )
 }
 
+if DATABASES['default'].get('ENGINE') == 'django.db.backends.sqlite3':
+    # Take the write lock when a transaction starts so concurrent writers wait
+    # on the busy timeout instead of failing half way through a transaction.
+    DATABASES['default'].setdefault('OPTIONS', {})['transaction_mode'] = 'IMMEDIATE'
+# Point tests at a file (SQLite) or dedicated database, e.g. for the
+# allocation stress test, which cannot run on an in-memory database.
+if os.environ.get('TEST_DATABASE_NAME'):
+    DATABASES['default']['TEST'] = {'NAME': os.environ['TEST_DATABASE_NAME']}
+
+# Cache: Redis when REDIS_URL is set, otherwise none. Dashboard values are
+# invalidated by whichever process saved the change, so a per-process cache
+# would leave the other gunicorn workers and `run_jobs` serving stale data.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    }
+}
+if os.environ.get('REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    }
+# Seconds a cached dashboard aggregate may live; changes invalidate it sooner
+DASHBOARD_CACHE_TIMEOUT = int(os.environ.get('DASHBOARD_CACHE_TIMEOUT', '900'))
+
+# Per-request SQL/template timing as Server-Timing headers and JSON log
+# lines on the hms.requests logger; the middleware drops out when off
+REQUEST_PROFILING = os.environ.get('REQUEST_PROFILING', 'False') == 'True'
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'hms.requests': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 # Static files (CSS, JavaScript, Images)
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'core/static']
@@ -59,6 +100,20 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 # Media files (Uploaded files like PDFs)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# When set (e.g. /protected-media/), downloads such as mess plans are handed
+# to nginx with X-Accel-Redirect; map the prefix to MEDIA_ROOT in an
+# `internal` location so files are only reachable through the views.
+MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get('MEDIA_ACCEL_REDIRECT_PREFIX', '')
+# Largest mess plan PDF a warden may upload, in bytes
+MESS_PLAN_MAX_UPLOAD_SIZE = int(os.environ.get('MESS_PLAN_MAX_UPLOAD_SIZE', str(50 * 1024 * 1024)))
+# Largest student import spreadsheet, in bytes; it is stored on the job row
+STUDENT_IMPORT_MAX_SIZE = int(os.environ.get('STUDENT_IMPORT_MAX_SIZE', str(10 * 1024 * 1024)))
+# Background jobs (fee generation, imports, mess plan previews) are run by
+# `manage.py run_jobs`; set to True to run them in the web process instead,
+# right after the request's transaction commits. Job input is kept in the
+# database, but mess plan previews read the PDF from MEDIA_ROOT, so the
+# worker must mount the same media volume as the web process.
+JOBS_RUN_INLINE = os.environ.get('JOBS_RUN_INLINE', 'False') == 'True'
 
 # Rest of your existing configuration remains the same below...
 AUTH_USER_MODEL = 'core.User'
@@ -94,9 +149,24 @@ USE_TZ = True
 
 # Authentication and Session settings
 LOGIN_URL = 'login'
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+# Session storage, set with SESSION_BACKEND:
+#   db             - a session table read on every request
+#   cached_db      - served from the cache, written through to the table
+#                    (default when REDIS_URL gives a cache shared by all
+#                    workers; a per-process cache would keep serving a
+#                    session after it was logged out in another worker)
+#   signed_cookies - no server-side storage at all
+# Expired rows of the db backends are removed hourly by the `run_jobs` worker
+# (see Procfile); `manage.py clearsessions` does the same by hand.
+SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'cached_db' if os.environ.get('REDIS_URL') else 'db')
+if SESSION_BACKEND not in ('db', 'cached_db', 'signed_cookies'):
+    raise ImproperlyConfigured(f"Unknown SESSION_BACKEND {SESSION_BACKEND!r}")
+SESSION_ENGINE = f'django.contrib.sessions.backends.{SESSION_BACKEND}'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTHENTICATION_BACKENDS = [
+    'core.backends.HostelUserBackend',
+    # Kept so sessions created before HostelUserBackend stay logged in;
+    # HostelUserBackend stops failed logins before they get here.
     'django.contrib.auth.backends.ModelBackend',
 ]
\ No newline at end of file